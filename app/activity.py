@@ -0,0 +1,214 @@
+import hashlib
+import json
+import os
+import sys
+from typing import Iterator, Optional, Tuple
+
+from .models import AccountInfo, ScammerStatus
+from .startup import lazy_import
+
+signature_module = lazy_import("solders.signature")
+
+# How many signatures / alerts are kept per wallet
+ACTIVITY_LIMIT = int(os.getenv("ACTIVITY_LIMIT", "50"))
+
+SIGNATURE_SIZE = 64
+
+
+class RingBuffer:
+    """Fixed-capacity FIFO, appends overwrite the oldest entry in O(1)."""
+    __slots__ = ("capacity", "_items", "_next", "_len")
+
+    def __init__(self, capacity: int = ACTIVITY_LIMIT):
+        self.capacity = max(1, capacity)
+        self._items: list = [None] * self.capacity
+        self._next = 0
+        self._len = 0
+
+    def append(self, item):
+        self._items[self._next] = item
+        self._next = (self._next + 1) % self.capacity
+        if self._len < self.capacity:
+            self._len += 1
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __iter__(self) -> Iterator:
+        start = (self._next - self._len) % self.capacity
+        for i in range(self._len):
+            yield self._items[(start + i) % self.capacity]
+
+    def nbytes(self) -> int:
+        return sys.getsizeof(self._items) + sum(sys.getsizeof(item) for item in self._items if item is not None)
+
+
+class SignatureRing:
+    """
+    Ring of transaction signatures stored as raw 64-byte values in a single
+    bytearray, instead of one ~88 char base58 str object per entry.
+    """
+    __slots__ = ("capacity", "_buffer", "_next", "_len")
+
+    def __init__(self, capacity: int = ACTIVITY_LIMIT):
+        self.capacity = max(1, capacity)
+        self._buffer = bytearray(self.capacity * SIGNATURE_SIZE)
+        self._next = 0
+        self._len = 0
+
+    def append(self, signature: str):
+        self.append_bytes(bytes(signature_module.Signature.from_string(signature)))
+
+    def append_bytes(self, raw: bytes):
+        offset = self._next * SIGNATURE_SIZE
+        self._buffer[offset:offset + SIGNATURE_SIZE] = raw
+        self._next = (self._next + 1) % self.capacity
+        if self._len < self.capacity:
+            self._len += 1
+
+    def __len__(self) -> int:
+        return self._len
+
+    def iter_bytes(self) -> Iterator[bytes]:
+        start = (self._next - self._len) % self.capacity
+        for i in range(self._len):
+            offset = ((start + i) % self.capacity) * SIGNATURE_SIZE
+            yield bytes(self._buffer[offset:offset + SIGNATURE_SIZE])
+
+    def __iter__(self) -> Iterator[str]:
+        for raw in self.iter_bytes():
+            yield str(signature_module.Signature.from_bytes(raw))
+
+    def last(self) -> Optional[str]:
+        """Most recently appended signature."""
+        if not self._len:
+            return None
+        offset = ((self._next - 1) % self.capacity) * SIGNATURE_SIZE
+        return str(signature_module.Signature.from_bytes(bytes(self._buffer[offset:offset + SIGNATURE_SIZE])))
+
+    def __contains__(self, signature: str) -> bool:
+        raw = bytes(signature_module.Signature.from_string(signature))
+        return any(entry == raw for entry in self.iter_bytes())
+
+    def nbytes(self) -> int:
+        return sys.getsizeof(self._buffer)
+
+
+class AlertRecord:
+    """Structured alert, only turned into text when somebody reads it."""
+    __slots__ = ("timestamp", "amount", "receiver", "risk")
+
+    def __init__(self, timestamp: float, amount: float, receiver: str, risk: str):
+        self.timestamp = timestamp
+        self.amount = amount
+        # Receivers and labels repeat a lot across wallets, share one str each
+        self.receiver = sys.intern(receiver)
+        self.risk = sys.intern(risk)
+
+    def format(self, address: str) -> str:
+        return f"⚠ ALERT: {address} moved {self.amount:.4f} SOL to {self.receiver}. Risk: {self.risk}"
+
+    def to_list(self) -> list:
+        return [self.timestamp, self.amount, self.receiver, self.risk]
+
+
+class WalletState:
+    """
+    Per-wallet state kept by the watchdog. The API model (ScammerStatus) is
+    only built from it when /status is read, and then reused until the
+    next change bumps `version`.
+    """
+    __slots__ = ("address", "balance", "status", "risk_label", "account_info", "signatures", "alerts",
+                 "backfill_cursor", "tier", "version", "_snapshot")
+
+    def __init__(self, address: str, balance: float = 0.0, status: str = "Monitoring",
+                 risk_label: str = "Unknown", account_info: Optional[AccountInfo] = None,
+                 capacity: int = ACTIVITY_LIMIT):
+        self.address = address
+        self.balance = balance
+        self.status = status
+        self.risk_label = risk_label
+        self.account_info = account_info
+        self.signatures = SignatureRing(capacity)
+        self.alerts = RingBuffer(capacity)
+        # Newest signature the history backfill has processed
+        self.backfill_cursor: Optional[str] = None
+        self.tier = "hot"
+        # Bumped by touch() on every change
+        self.version = 0
+        self._snapshot: Optional[Tuple[int, bytes, str]] = None
+
+    def touch(self):
+        """Marks the state as changed, so the next snapshot() is rebuilt."""
+        self.version += 1
+
+    def snapshot(self) -> Tuple[bytes, str]:
+        """
+        Serialized ScammerStatus and its ETag, built once per version.
+        The ETag hashes the body, so it stays valid across restarts even
+        where versions start over.
+        """
+        cached = self._snapshot
+        if cached is None or cached[0] != self.version:
+            body = self.to_status().model_dump_json().encode()
+            cached = self._snapshot = (self.version, body, f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"')
+        return cached[1], cached[2]
+
+    def to_status(self) -> ScammerStatus:
+        return ScammerStatus(
+            address=self.address,
+            balance=self.balance,
+            status=self.status,
+            risk_label=self.risk_label,
+            latest_activity=list(self.signatures),
+            recent_logs=[alert.format(self.address) for alert in self.alerts],
+            account_info=self.account_info,
+            tier=self.tier,
+            version=self.version,
+        )
+
+    def nbytes(self) -> int:
+        """Approximate memory held by this wallet's state."""
+        size = sys.getsizeof(self) + self.signatures.nbytes() + self.alerts.nbytes()
+        size += sum(sys.getsizeof(alert.receiver) + sys.getsizeof(alert.risk) for alert in self.alerts)
+        size += sys.getsizeof(self.address) + sys.getsizeof(self.status) + sys.getsizeof(self.risk_label)
+        if self.account_info is not None:
+            size += sys.getsizeof(self.account_info) + sum(sys.getsizeof(t) for t in self.account_info.tokens)
+        if self._snapshot is not None:
+            size += sys.getsizeof(self._snapshot[1])
+        return size
+
+    def to_json(self) -> str:
+        return json.dumps({
+            "address": self.address,
+            "balance": self.balance,
+            "status": self.status,
+            "risk_label": self.risk_label,
+            "account_info": self.account_info.model_dump() if self.account_info else None,
+            "signatures": b"".join(self.signatures.iter_bytes()).hex(),
+            "alerts": [alert.to_list() for alert in self.alerts],
+            "backfill_cursor": self.backfill_cursor,
+            "tier": self.tier,
+            "version": self.version,
+        })
+
+    @classmethod
+    def from_json(cls, raw: str) -> "WalletState":
+        data = json.loads(raw)
+        account_info = data.get("account_info")
+        state = cls(
+            data["address"],
+            balance=data["balance"],
+            status=data["status"],
+            risk_label=data["risk_label"],
+            account_info=AccountInfo.model_validate(account_info) if account_info else None,
+        )
+        signatures = bytes.fromhex(data["signatures"])
+        for offset in range(0, len(signatures), SIGNATURE_SIZE):
+            state.signatures.append_bytes(signatures[offset:offset + SIGNATURE_SIZE])
+        for alert in data["alerts"]:
+            state.alerts.append(AlertRecord(*alert))
+        state.backfill_cursor = data.get("backfill_cursor")
+        state.tier = data.get("tier", "hot")
+        state.version = data.get("version", 0)
+        return state
@@ -0,0 +1,384 @@
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from abc import ABC, abstractmethod
+from email.utils import parsedate_to_datetime
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+from .metrics import ANALYSIS_TO_ALERT
+from .startup import lazy_import
+
+if TYPE_CHECKING:
+    import httpx
+
+httpx = lazy_import("httpx")  # noqa: F811
+
+
+class TokenBucket:
+    """Allows `rate` sends per second with bursts of up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class SinkError(Exception):
+    """Delivery failed; retry_after is set when the provider asked us to slow down."""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AlertSink(ABC):
+    name = "sink"
+
+    def __init__(self, rate: Optional[float] = None, burst: Optional[float] = None):
+        self.bucket = TokenBucket(
+            rate or float(os.getenv("ALERT_RATE_PER_SEC", "1")),
+            burst or float(os.getenv("ALERT_BURST", "5")),
+        )
+
+    @abstractmethod
+    async def send(self, wallet: str, text: str):
+        ...
+
+    async def close(self):
+        pass
+
+
+class LogSink(AlertSink):
+    name = "log"
+
+    async def send(self, wallet: str, text: str):
+        print(f"[Alert]: {text}")
+
+
+def _retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds from a Retry-After header, either delay-seconds or an HTTP date; None if unusable."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None  # Falls back to exponential backoff
+
+
+class WebhookSink(AlertSink):
+    """POSTs {"wallet", "text"} as JSON to a URL."""
+    name = "webhook"
+
+    def __init__(self, url: str, headers: Optional[dict] = None, **kwargs):
+        super().__init__(**kwargs)
+        self.url = url
+        self.headers = headers or {}
+        self._client: "Optional[httpx.AsyncClient]" = None
+
+    def payload(self, wallet: str, text: str) -> dict:
+        return {"wallet": wallet, "text": text}
+
+    async def send(self, wallet: str, text: str):
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=10)
+        try:
+            response = await self._client.post(self.url, json=self.payload(wallet, text), headers=self.headers)
+        except httpx.HTTPError as e:
+            raise SinkError(f"{self.name}: {e}")
+        if response.status_code == 429:
+            raise SinkError(f"{self.name}: rate limited", _retry_after(response.headers.get("Retry-After")))
+        if response.status_code >= 400:
+            raise SinkError(f"{self.name}: HTTP {response.status_code}")
+
+    async def close(self):
+        # Cleared so a dispatcher started again opens a fresh client
+        client, self._client = self._client, None
+        if client is not None:
+            await client.aclose()
+
+
+class WhatsAppSink(WebhookSink):
+    """WhatsApp Cloud API text message."""
+    name = "whatsapp"
+
+    def __init__(self, url: str, token: str, recipient: str, **kwargs):
+        super().__init__(url, headers={"Authorization": f"Bearer {token}"}, **kwargs)
+        self.recipient = recipient
+
+    def payload(self, wallet: str, text: str) -> dict:
+        return {
+            "messaging_product": "whatsapp",
+            "to": self.recipient,
+            "type": "text",
+            "text": {"body": text},
+        }
+
+
+class _Window:
+    __slots__ = ("opened", "counts")
+
+    def __init__(self):
+        self.opened = time.monotonic()
+        self.counts: Dict[str, int] = {}
+
+
+class AlertDispatcher:
+    """
+    Decouples alerting from transaction analysis.
+
+    submit() puts alerts on a bounded queue (callers wait when it is full).
+    The first alert for a wallet goes out right away; anything else for that
+    wallet during the next digest_window is deduplicated and sent as one
+    digest when the window closes. Every sink has its own bounded queue,
+    drained by a fixed number of workers that share the sink's token bucket
+    and retry failed deliveries with exponential backoff. A slow sink fills
+    its queue, which stalls the consumer, which fills the main queue, so
+    analysis ends up waiting in submit() instead of tasks piling up.
+    """
+
+    def __init__(self, sinks: List[AlertSink], queue_size: Optional[int] = None,
+                 digest_window: Optional[float] = None, max_retries: Optional[int] = None,
+                 workers_per_sink: Optional[int] = None):
+        self.sinks = sinks
+        queue_size = queue_size or int(os.getenv("ALERT_QUEUE_SIZE", "1000"))
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._sink_queues: List[asyncio.Queue] = [asyncio.Queue(maxsize=queue_size) for _ in sinks]
+        self.workers_per_sink = workers_per_sink or int(os.getenv("ALERT_SINK_WORKERS", "2"))
+        self.digest_window = digest_window if digest_window is not None else float(os.getenv("ALERT_DIGEST_WINDOW", "60"))
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv("ALERT_MAX_RETRIES", "5"))
+        # Insertion order is opening order, so the first window is the next to close
+        self._windows: Dict[str, _Window] = {}
+        self._window_opened = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+        self.drain_timeout = float(os.getenv("ALERT_DRAIN_TIMEOUT", "5"))
+        self._delivering = 0
+        self.delivered = 0
+        self.failed = 0
+        self.suppressed = 0
+        self.lost = 0
+
+    def start(self):
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._consume()), asyncio.create_task(self._close_windows())]
+            for sink, queue in zip(self.sinks, self._sink_queues):
+                self._tasks.extend(asyncio.create_task(self._work(sink, queue)) for _ in range(self.workers_per_sink))
+
+    async def stop(self):
+        """
+        Gives queued alerts and open digests up to drain_timeout seconds to go
+        out, then cancels the rest and reports what was not delivered.
+        """
+        tasks, self._tasks = self._tasks, []
+        if tasks:
+            try:
+                await asyncio.wait_for(self._drain(), self.drain_timeout)
+            except asyncio.TimeoutError:
+                pass
+        for task in tasks:
+            task.cancel()
+        queued = self.queue.qsize()
+        digests = sum(1 for window in self._windows.values() if window.counts)
+        deliveries = sum(queue.qsize() for queue in self._sink_queues) + self._delivering
+        lost = (queued + digests) * len(self.sinks) + deliveries
+        if lost:
+            self.lost += lost
+            print(f"Alert dispatcher stopped with {queued} alerts and {digests} digests still queued "
+                  f"and {deliveries} deliveries unfinished")
+        for sink in self.sinks:
+            await sink.close()
+
+    async def _drain(self):
+        await self.queue.join()
+        # Digests would otherwise wait for the rest of their window
+        while self._windows:
+            wallet = next(iter(self._windows))
+            window = self._windows.pop(wallet)
+            if window.counts:
+                await self._dispatch(wallet, self._digest(wallet, window))
+        for queue in self._sink_queues:
+            await queue.join()
+
+    async def submit(self, wallet: str, text: str, raised_at: Optional[float] = None):
+        """raised_at (perf_counter) is when analysis produced the alert, for latency metrics."""
+        await self.queue.put((wallet, text, raised_at))
+
+    async def _consume(self):
+        while True:
+            wallet, text, raised_at = await self.queue.get()
+            try:
+                window = self._windows.get(wallet)
+                if window is None:
+                    self._windows[wallet] = _Window()
+                    self._window_opened.set()
+                    await self._dispatch(wallet, text, raised_at)
+                else:
+                    self.suppressed += 1
+                    window.counts[text] = window.counts.get(text, 0) + 1
+            finally:
+                self.queue.task_done()
+
+    async def _close_windows(self):
+        """Sends the digest of every window whose digest_window has passed, oldest first."""
+        while True:
+            if not self._windows:
+                self._window_opened.clear()
+                await self._window_opened.wait()
+                continue
+            wallet, window = next(iter(self._windows.items()))
+            delay = window.opened + self.digest_window - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+            del self._windows[wallet]
+            if window.counts:
+                await self._dispatch(wallet, self._digest(wallet, window))
+
+    def _digest(self, wallet: str, window: _Window) -> str:
+        total = sum(window.counts.values())
+        lines = [text if n == 1 else f"{text} (x{n})" for text, n in window.counts.items()]
+        return f"{total} more alerts for {wallet} in the last {self.digest_window:g}s:\n" + "\n".join(lines)
+
+    async def _dispatch(self, wallet: str, text: str, raised_at: Optional[float] = None):
+        # Waits while a sink is backed up
+        for queue in self._sink_queues:
+            await queue.put((wallet, text, raised_at))
+
+    async def _work(self, sink: AlertSink, queue: asyncio.Queue):
+        while True:
+            wallet, text, raised_at = await queue.get()
+            self._delivering += 1
+            try:
+                await self._deliver(sink, wallet, text, raised_at)
+            finally:
+                self._delivering -= 1
+                queue.task_done()
+
+    async def _deliver(self, sink: AlertSink, wallet: str, text: str, raised_at: Optional[float] = None):
+        for attempt in range(self.max_retries + 1):
+            await sink.bucket.acquire()
+            try:
+                await sink.send(wallet, text)
+                self.delivered += 1
+                if raised_at is not None:
+                    # Digests are held back on purpose and are not timed
+                    ANALYSIS_TO_ALERT.observe(time.perf_counter() - raised_at, sink=sink.name)
+                return
+            except Exception as e:
+                delay = getattr(e, "retry_after", None) or min(60.0, 2 ** attempt) * (0.5 + random.random())
+                print(f"Alert delivery via {sink.name} failed ({e}), attempt {attempt + 1}")
+                if attempt < self.max_retries:
+                    await asyncio.sleep(delay)
+        self.failed += 1
+
+    def stats(self) -> dict:
+        return {
+            "queued": self.queue.qsize(),
+            "sink_queued": {sink.name: queue.qsize() for sink, queue in zip(self.sinks, self._sink_queues)},
+            "open_windows": len(self._windows),
+            "delivered": self.delivered,
+            "failed": self.failed,
+            "suppressed": self.suppressed,
+            "lost": self.lost,
+        }
+
+
+def create_sinks() -> List[AlertSink]:
+    sinks: List[AlertSink] = []
+    for name in os.getenv("ALERT_SINKS", "log").split(","):
+        name = name.strip()
+        if name == "log":
+            sinks.append(LogSink())
+        elif name == "webhook":
+            sinks.append(WebhookSink(os.getenv("ALERT_WEBHOOK_URL", "http://127.0.0.1:9009/alerts")))
+        elif name == "whatsapp":
+            settings = {key: os.getenv(key, "") for key in ("WHATSAPP_API_URL", "WHATSAPP_API_TOKEN", "WHATSAPP_TO")}
+            missing = [key for key, value in settings.items() if not value]
+            if missing:
+                # Every alert would fail and be retried; refuse to start instead
+                raise ValueError(f"ALERT_SINKS includes whatsapp, but these are not set: {', '.join(missing)}")
+            sinks.append(WhatsAppSink(*settings.values()))
+        elif name:
+            print(f"Warning: unknown alert sink {name}")
+    return sinks
+
+
+alert_dispatcher = AlertDispatcher(create_sinks())
+
+
+class LocalSinkServer:
+    """
+    Tiny HTTP server standing in for a webhook/WhatsApp endpoint.
+    Records every POST body; fail_rate makes it answer 429 at random so the
+    retry path can be exercised without a real provider.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 9009, fail_rate: float = 0.0):
+        self.host = host
+        self.port = port
+        self.fail_rate = fail_rate
+        self.received: List[dict] = []
+        self._server = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request_line = await reader.readline()
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode().partition(":")
+                if name.strip().lower() == "content-length":
+                    length = int(value.strip())
+            body = await reader.readexactly(length) if length else b""
+
+            if random.random() < self.fail_rate:
+                status = "429 Too Many Requests\r\nRetry-After: 1"
+            else:
+                status = "200 OK"
+                payload = json.loads(body) if body else {}
+                self.received.append(payload)
+                print(f"[LocalSink] {request_line.decode().strip()} {payload}")
+            writer.write(f"HTTP/1.1 {status}\r\nContent-Length: 0\r\nConnection: close\r\n\r\n".encode())
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def serve_forever(self):
+        await self.start()
+        print(f"Local alert sink listening on http://{self.host}:{self.port}")
+        async with self._server:
+            await self._server.serve_forever()
+
+
+if __name__ == "__main__":
+    # python -m app.alerts [port] [fail_rate]
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 9009
+    fail_rate = float(sys.argv[2]) if len(sys.argv) > 2 else 0.0
+    asyncio.run(LocalSinkServer(port=port, fail_rate=fail_rate).serve_forever())
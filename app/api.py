@@ -1,22 +1,51 @@
-from fastapi import APIRouter, BackgroundTasks, HTTPException
-from typing import Dict
-from .models import VerificationRequest, VerificationResponse, MonitorRequest, ScammerStatus
-from .verification import verify_transaction
+import asyncio
+import hashlib
+import json
+import time
+from fastapi import APIRouter, BackgroundTasks, Header, HTTPException, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from typing import Dict, List, Optional
+from .models import (VerificationRequest, VerificationResponse, BatchVerificationResponse, MonitorRequest,
+                     ScammerStatus, BulkStatusResponse)
+from .verification import verify_transaction, verify_batch
 from .watchdog import watchdog_service
-from .state import scammer_db
+from .state import get_status as load_status, get_statuses as load_statuses, put_status, scammer_db, cluster
+from .activity import WalletState, ACTIVITY_LIMIT
+from .cache import transaction_cache
+from .lookup_tables import lookup_tables
+from .tokens import mint_registry
+from .rpc import solana_rpc
+from .tracer import FundFlowTracer
+from .alerts import alert_dispatcher
+from .streaming import StreamClient, status_relay, status_stream
+
+# Seconds between SSE keepalive comments
+STREAM_KEEPALIVE = 15
 
 router = APIRouter()
 
-@router.post("/verify", response_model=VerificationResponse)
-async def verify_tx(request: VerificationRequest):
-    result = verify_transaction(request.transaction_signature, request.user_wallet, request.scammer_wallet)
-    
+# Largest list accepted by /verify/batch
+MAX_BATCH_SIZE = 5000
+
+# Most addresses accepted by GET /status
+MAX_STATUS_ADDRESSES = 1000
+
+# Most wallets one /stream connection may follow
+MAX_STREAM_ADDRESSES = 1000
+
+# Most wallets a single /trace may visit; signatures per wallet are one getSignaturesForAddress page
+MAX_TRACE_ADDRESSES = 2000
+MAX_TRACE_SIGNATURES = 1000
+
+def _verification_response(result: dict) -> VerificationResponse:
     if result["verified"]:
         return VerificationResponse(
             verified=True,
             amount=result.get("amount", 0.0),
             token=result.get("token", "SOL"),
             mint=result.get("mint"),
+            raw_amount=result.get("raw_amount"),
+            decimals=result.get("decimals"),
             timestamp=result.get("timestamp", 0),
             message=result.get("message", "Transaction Verified")
         )
@@ -32,24 +61,244 @@ async def verify_tx(request: VerificationRequest):
             message=result["message"]
         )
 
+@router.post("/verify", response_model=VerificationResponse, response_model_exclude_unset=True)
+async def verify_tx(request: VerificationRequest, timings: bool = False):
+    started = time.perf_counter()
+    breakdown: Optional[Dict[str, float]] = {} if timings else None
+    result = await verify_transaction(request.transaction_signature, request.user_wallet, request.scammer_wallet, breakdown)
+    response = _verification_response(result)
+    if breakdown is not None:
+        breakdown["total_ms"] = (time.perf_counter() - started) * 1000
+        response.timings = breakdown
+    return response
+
+@router.post("/verify/batch", response_model=BatchVerificationResponse, response_model_exclude_unset=True)
+async def verify_tx_batch(requests: List[VerificationRequest], stream: bool = False):
+    if len(requests) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"Batch too large, max {MAX_BATCH_SIZE} items")
+
+    if stream:
+        # One VerificationResponse per line, in request order
+        async def ndjson():
+            async for result in verify_batch(requests):
+                yield _verification_response(result).model_dump_json(exclude_unset=True) + "\n"
+        return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+    results = [_verification_response(result) async for result in verify_batch(requests)]
+    return BatchVerificationResponse(results=results)
+
 @router.post("/monitor")
 async def start_monitoring(request: MonitorRequest, background_tasks: BackgroundTasks):
-    # Update DB
-    scammer_db[request.scammer_wallet] = ScammerStatus(
-        address=request.scammer_wallet,
-        balance=0.0, # Fetch real balance
-        status="Monitoring",
-        risk_label="Unknown",
-        latest_activity=[]
-    )
+    # Update DB, keeping history if this wallet was monitored before
+    if await load_status(request.scammer_wallet) is None:
+        put_status(WalletState(request.scammer_wallet))
     
     # Start the watchdog in python background task
     background_tasks.add_task(watchdog_service.start_monitoring, request.scammer_wallet)
     
     return {"status": "Monitoring started", "address": request.scammer_wallet}
 
+def _cached_json(body: bytes, etag: str, if_none_match: Optional[str]) -> Response:
+    """Serves a pre-serialized body, or 304 when the client already has this ETag."""
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    # Weak comparison, as If-None-Match requires: W/"x" matches "x"
+    if if_none_match is not None and (if_none_match.strip() == "*" or
+                                      etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
 @router.get("/status/{address}", response_model=ScammerStatus)
-async def get_status(address: str):
-    if address not in scammer_db:
+async def get_status(address: str, if_none_match: Optional[str] = Header(None)):
+    status = await load_status(address)
+    if status is None:
         raise HTTPException(status_code=404, detail="Address not found in monitoring")
-    return scammer_db[address]
+    body, etag = status.snapshot()
+    return _cached_json(body, etag, if_none_match)
+
+@router.get("/status", response_model=BulkStatusResponse)
+async def get_statuses(addresses: str, if_none_match: Optional[str] = Header(None)):
+    """Many wallets at once, assembled from their cached snapshots."""
+    wanted = list(dict.fromkeys(a for a in addresses.split(",") if a))
+    if len(wanted) > MAX_STATUS_ADDRESSES:
+        raise HTTPException(status_code=413, detail=f"Too many addresses, max {MAX_STATUS_ADDRESSES}")
+
+    bodies, etags, missing = [], [], []
+    for address, status in zip(wanted, await load_statuses(wanted)):
+        if status is None:
+            missing.append(address)
+            continue
+        body, etag = status.snapshot()
+        bodies.append(body)
+        etags.append(etag)
+    body = b'{"statuses":[' + b",".join(bodies) + b'],"missing":' + json.dumps(missing).encode() + b"}"
+    etag = f'"{hashlib.blake2b(",".join(etags + missing).encode(), digest_size=8).hexdigest()}"'
+    return _cached_json(body, etag, if_none_match)
+
+async def _follow(client: StreamClient, addresses: List[str]):
+    """Subscribes a stream client, starting each wallet with a full snapshot."""
+    new = [a for a in dict.fromkeys(addresses) if a not in client.addresses]
+    if len(client.addresses) + len(new) > MAX_STREAM_ADDRESSES:
+        raise ValueError(f"A stream can follow at most {MAX_STREAM_ADDRESSES} addresses")
+    for address in new:
+        status = await load_status(address)
+        snapshot = status.to_status().model_dump() if status is not None else None
+        status_stream.subscribe(client, address, snapshot)
+        if status is not None and not cluster.owns(address):
+            status_relay.seen(address, status.version)
+
+def _valid_command(command) -> bool:
+    """{"subscribe": [...], "unsubscribe": [...]}, either key optional, addresses as strings."""
+    if not isinstance(command, dict):
+        return False
+    for key in ("subscribe", "unsubscribe"):
+        value = command.get(key)
+        if value is not None and not (isinstance(value, list) and all(isinstance(a, str) for a in value)):
+            return False
+    return True
+
+@router.get("/stream")
+async def stream_sse(addresses: str):
+    """Server-Sent Events: a snapshot per wallet, then signature/alert/balance deltas."""
+    client = status_stream.connect()
+    try:
+        await _follow(client, [a for a in addresses.split(",") if a])
+    except ValueError as e:
+        status_stream.disconnect(client)
+        raise HTTPException(status_code=400, detail=str(e))
+
+    async def events():
+        try:
+            while True:
+                try:
+                    message = await asyncio.wait_for(client.get(), timeout=STREAM_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if message is None:
+                    return
+                yield f"data: {message}\n\n"
+        finally:
+            status_stream.disconnect(client)
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@router.websocket("/stream")
+async def stream_ws(websocket: WebSocket, addresses: str = ""):
+    """
+    Same events over a WebSocket. Send {"subscribe": [...]} or
+    {"unsubscribe": [...]} at any time to change the followed wallets.
+    Anything else closes the socket with 1003.
+    """
+    await websocket.accept()
+    client = status_stream.connect()
+    close_code = None
+
+    async def read_commands():
+        nonlocal close_code
+        try:
+            async for command in websocket.iter_json():
+                if not _valid_command(command):
+                    close_code = 1003
+                    break
+                if command.get("unsubscribe"):
+                    status_stream.unsubscribe(client, command["unsubscribe"])
+                if command.get("subscribe"):
+                    try:
+                        await _follow(client, command["subscribe"])
+                    except ValueError as e:
+                        client.offer(json.dumps({"type": "error", "message": str(e)}))
+        except ValueError:
+            close_code = 1003  # Not JSON
+        except WebSocketDisconnect:
+            pass
+        finally:
+            # Wakes the sender below once the browser goes away
+            if not client.dropped:
+                client.end()
+
+    try:
+        await _follow(client, [a for a in addresses.split(",") if a])
+    except ValueError as e:
+        status_stream.disconnect(client)
+        await websocket.send_text(json.dumps({"type": "error", "message": str(e)}))
+        await websocket.close(code=1008)
+        return
+    reader = asyncio.create_task(read_commands())
+    try:
+        while True:
+            message = await client.get()
+            if message is None:
+                break
+            await websocket.send_text(message)
+        if close_code is not None:
+            await websocket.close(code=close_code)
+        elif not reader.done():
+            # Dropped as a slow consumer, the browser is still there
+            await websocket.close(code=1008)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        reader.cancel()
+        status_stream.disconnect(client)
+
+@router.get("/tiers")
+async def get_tiers():
+    """Live (hot) vs polled (cold) wallets in this worker."""
+    return watchdog_service.tier_info()
+
+@router.get("/firehose/stats")
+async def get_firehose_stats():
+    firehose = watchdog_service.firehose
+    return firehose.stats() if firehose is not None else {"enabled": False}
+
+@router.get("/stream/stats")
+async def get_stream_stats():
+    return {**status_stream.stats(), "relayed": status_relay.relayed}
+
+@router.get("/trace/{address}")
+async def trace_funds(address: str, hops: int = 5, min_sol: float = 0.01, min_token: float = 0.0,
+                      max_signatures: int = 50, max_addresses: int = 200):
+    if not 1 <= hops <= 10:
+        raise HTTPException(status_code=400, detail="hops must be between 1 and 10")
+    if not 1 <= max_signatures <= MAX_TRACE_SIGNATURES:
+        raise HTTPException(status_code=400, detail=f"max_signatures must be between 1 and {MAX_TRACE_SIGNATURES}")
+    if not 1 <= max_addresses <= MAX_TRACE_ADDRESSES:
+        raise HTTPException(status_code=400, detail=f"max_addresses must be between 1 and {MAX_TRACE_ADDRESSES}")
+    tracer = FundFlowTracer(address, max_hops=hops, min_sol=min_sol, min_token=min_token,
+                            max_signatures=max_signatures, max_addresses=max_addresses)
+
+    # NDJSON: one edge per line as the crawl finds it, then a "done" summary
+    async def ndjson():
+        async for event in tracer.run():
+            yield json.dumps(event) + "\n"
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+@router.get("/stats/memory")
+async def get_memory_stats():
+    # Only wallets currently cached in this process
+    sizes = [state.nbytes() for state in scammer_db.values()]
+    return {
+        "wallets": len(sizes),
+        "activity_limit": ACTIVITY_LIMIT,
+        "total_bytes": sum(sizes),
+        "avg_bytes_per_wallet": sum(sizes) // len(sizes) if sizes else 0,
+    }
+
+@router.get("/alerts/stats")
+async def get_alert_stats():
+    return alert_dispatcher.stats()
+
+@router.get("/cache/stats")
+async def get_cache_stats():
+    return transaction_cache.stats()
+
+@router.get("/cache/mints")
+async def get_mint_stats():
+    return mint_registry.stats()
+
+@router.get("/cache/lookup-tables")
+async def get_lookup_table_stats():
+    return lookup_tables.stats()
+
+@router.get("/rpc/stats")
+async def get_rpc_stats():
+    return {"endpoints": solana_rpc.stats()}
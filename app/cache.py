@@ -0,0 +1,266 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .rpc import responses, solana_rpc
+
+if TYPE_CHECKING:
+    from solders.rpc.responses import GetTransactionResp
+
+# Commitment levels, weakest first
+COMMITMENT_RANK = {"processed": 0, "confirmed": 1, "finalized": 2}
+
+
+class _Entry:
+    __slots__ = ("value", "commitment", "expires_at")
+
+    def __init__(self, value: Any, commitment: str, expires_at: Optional[float]):
+        self.value = value
+        self.commitment = commitment
+        self.expires_at = expires_at
+
+
+class LRUCache:
+    """Bounded LRU for values that don't go stale, with hit/miss counters."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Any:
+        value = self._entries.get(key)
+        if value is not None:
+            self._entries.move_to_end(key)
+        return value
+
+    def lookup(self, key: str) -> Any:
+        """Like get(), but counted in the hit/miss stats."""
+        return self._count(self.get(key))
+
+    def _count(self, value: Any) -> Any:
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def put(self, key: str, value: Any):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class TransactionCache(LRUCache):
+    """
+    LRU cache of transactions keyed by signature, aware of commitment.
+    Finalized entries never change so they only leave through LRU eviction
+    (unless finalized_ttl is set); confirmed entries expire after confirmed_ttl
+    so a dropped fork can't stick around. Concurrent lookups for the same
+    signature share a single fetch, whether it was started alone or as part
+    of a batch.
+    """
+
+    def __init__(self, max_size: Optional[int] = None, confirmed_ttl: Optional[float] = None,
+                 finalized_ttl: Optional[float] = None):
+        super().__init__(max_size or int(os.getenv("TX_CACHE_SIZE", "10000")))
+        self.confirmed_ttl = confirmed_ttl if confirmed_ttl is not None else float(os.getenv("TX_CACHE_CONFIRMED_TTL", "30"))
+        self.finalized_ttl = finalized_ttl if finalized_ttl is not None else float(os.getenv("TX_CACHE_FINALIZED_TTL", "0"))
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.coalesced = 0
+        self.expirations = 0
+
+    def _ttl(self, commitment: str) -> float:
+        return self.finalized_ttl if commitment == "finalized" else self.confirmed_ttl
+
+    def get(self, key: str, commitment: str = "confirmed") -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at is not None and entry.expires_at <= time.monotonic():
+            del self._entries[key]
+            self.expirations += 1
+            return None
+        if COMMITMENT_RANK[entry.commitment] < COMMITMENT_RANK[commitment]:
+            return None
+        self._entries.move_to_end(key)
+        return entry.value
+
+    def lookup(self, key: str, commitment: str = "confirmed") -> Any:
+        """Like get(), but counted in the hit/miss stats."""
+        return self._count(self.get(key, commitment))
+
+    def put(self, key: str, value: Any, commitment: str = "confirmed"):
+        ttl = self._ttl(commitment)
+        super().put(key, _Entry(value, commitment, time.monotonic() + ttl if ttl > 0 else None))
+
+    async def get_or_fetch(self, key: str, fetch: Callable[[str], Awaitable[Tuple[Any, str]]],
+                           commitment: str = "confirmed") -> Any:
+        """
+        Returns the cached value or awaits fetch(key) -> (value, commitment).
+        None results are handed back but not cached. The fetch runs in its own
+        task, so a caller being cancelled doesn't cancel it for the others
+        waiting on the same key.
+        """
+        value = self.get(key, commitment)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            task = asyncio.create_task(self._fetch(key, fetch))
+            # Read the exception even if every caller is gone, so it isn't logged as unretrieved
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self._inflight[key] = task
+        return await asyncio.shield(task)
+
+    async def _fetch(self, key: str, fetch: Callable[[str], Awaitable[Tuple[Any, str]]]) -> Any:
+        try:
+            value, fetched_commitment = await fetch(key)
+            if value is not None:
+                self.put(key, value, fetched_commitment)
+            return value
+        finally:
+            del self._inflight[key]
+
+    async def get_or_fetch_many(self, keys: List[str],
+                                fetch_many: Callable[[List[str]], Awaitable[Dict[str, Tuple[Any, str]]]],
+                                commitment: str = "confirmed") -> Dict[str, Any]:
+        """
+        get_or_fetch() for many keys. Keys already being fetched are awaited,
+        the remaining misses go to one fetch_many(keys) -> {key: (value, commitment)},
+        and lookups of those keys started meanwhile wait on it too.
+        """
+        found: Dict[str, Any] = {}
+        pending: Dict[str, asyncio.Future] = {}
+        missing: Dict[str, asyncio.Future] = {}
+        for key in dict.fromkeys(keys):
+            value = self.get(key, commitment)
+            if value is not None:
+                self.hits += 1
+                found[key] = value
+            elif key in self._inflight:
+                self.coalesced += 1
+                pending[key] = self._inflight[key]
+            else:
+                self.misses += 1
+                future = asyncio.get_running_loop().create_future()
+                future.add_done_callback(lambda f: f.cancelled() or f.exception())
+                self._inflight[key] = pending[key] = missing[key] = future
+
+        if missing:
+            task = asyncio.create_task(self._fetch_many(missing, fetch_many))
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        values = await asyncio.gather(*(asyncio.shield(future) for future in pending.values()))
+        found.update(zip(pending, values))
+        return found
+
+    async def _fetch_many(self, futures: Dict[str, asyncio.Future],
+                          fetch_many: Callable[[List[str]], Awaitable[Dict[str, Tuple[Any, str]]]]):
+        try:
+            results = await fetch_many(list(futures))
+            for key, future in futures.items():
+                value, fetched_commitment = results.get(key, (None, "confirmed"))
+                if value is not None:
+                    self.put(key, value, fetched_commitment)
+                future.set_result(value)
+        except asyncio.CancelledError:
+            for future in futures.values():
+                future.cancel()
+            raise
+        except Exception as e:
+            for future in futures.values():
+                if not future.done():
+                    future.set_exception(e)
+            raise
+        finally:
+            for key in futures:
+                del self._inflight[key]
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        lookups = self.hits + self.misses + self.coalesced
+        stats.update(
+            coalesced=self.coalesced,
+            expirations=self.expirations,
+            inflight=len(self._inflight),
+            hit_ratio=round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+        )
+        return stats
+
+
+transaction_cache = TransactionCache()
+
+# Signatures per batched getTransaction request
+TRANSACTION_BATCH_SIZE = int(os.getenv("RPC_BATCH_SIZE", "100"))
+
+# A confirmed tx is finalized ~32 slots later; past this age we treat it as final
+FINALITY_AGE = float(os.getenv("TX_CACHE_FINALITY_AGE", "60"))
+
+
+def transaction_commitment(tx: "GetTransactionResp") -> str:
+    block_time = tx.value.block_time
+    if block_time is not None and time.time() - block_time >= FINALITY_AGE:
+        return "finalized"
+    return "confirmed"
+
+
+async def _fetch_transaction(signature: str) -> "Tuple[Optional[GetTransactionResp], str]":
+    tx = await solana_rpc.get_transaction(signature)
+    if not tx.value:
+        return None, "confirmed"
+    return tx, transaction_commitment(tx)
+
+
+async def get_transaction(signature: str) -> "GetTransactionResp":
+    """
+    Cached getTransaction. Misses (not found yet) are returned as an empty
+    response so callers keep checking tx.value like before.
+    """
+    tx = await transaction_cache.get_or_fetch(signature, _fetch_transaction)
+    if tx is None:
+        return responses.GetTransactionResp(None)
+    return tx
+
+
+async def _fetch_transactions(signatures: List[str]) -> "Dict[str, Tuple[Optional[GetTransactionResp], str]]":
+    """getTransaction for many signatures, in JSON-RPC batches of TRANSACTION_BATCH_SIZE."""
+    results: "Dict[str, Tuple[Optional[GetTransactionResp], str]]" = {}
+    chunks = [signatures[i:i + TRANSACTION_BATCH_SIZE] for i in range(0, len(signatures), TRANSACTION_BATCH_SIZE)]
+    for chunk, txs in zip(chunks, await asyncio.gather(*(solana_rpc.get_transactions(c) for c in chunks))):
+        for signature, tx in zip(chunk, txs):
+            results[signature] = (tx, transaction_commitment(tx)) if tx.value else (None, "confirmed")
+    return results
+
+
+async def get_transactions(signatures: List[str]) -> "Dict[str, GetTransactionResp]":
+    """
+    Cached getTransaction for many signatures at once. Misses are fetched in
+    batches, and signatures another caller is already fetching are shared.
+    """
+    txs = await transaction_cache.get_or_fetch_many(signatures, _fetch_transactions)
+    return {signature: tx if tx is not None else responses.GetTransactionResp(None) for signature, tx in txs.items()}
@@ -0,0 +1,120 @@
+import asyncio
+import bisect
+import hashlib
+import os
+import socket
+from typing import Awaitable, Callable, Iterable, List, Optional
+
+from .store import StateStore
+
+# Points per worker on the ring; more points = more even split
+RING_REPLICAS = 64
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """
+    Consistent hash ring of worker ids. Adding or removing a worker only
+    moves the wallets that hashed to its points.
+    """
+
+    def __init__(self, workers: Iterable[str], replicas: int = RING_REPLICAS):
+        self.workers = sorted(set(workers))
+        points = sorted((_hash(f"{worker}#{i}"), worker) for worker in self.workers for i in range(replicas))
+        self._hashes = [h for h, _ in points]
+        self._owners = [w for _, w in points]
+
+    def owner(self, address: str) -> Optional[str]:
+        if not self._hashes:
+            return None
+        index = bisect.bisect(self._hashes, _hash(address)) % len(self._hashes)
+        return self._owners[index]
+
+
+class Cluster:
+    """
+    Membership of the worker processes sharing one state store.
+
+    Every worker writes a heartbeat to the store and rebuilds the ring from
+    the workers whose heartbeat is recent, so wallets move when a worker
+    starts, stops or dies. With CLUSTER_ENABLED unset this process owns every
+    wallet and nothing is written.
+    """
+
+    def __init__(self, store: StateStore, worker_id: Optional[str] = None, enabled: Optional[bool] = None,
+                 heartbeat_interval: Optional[float] = None, timeout: Optional[float] = None):
+        self.store = store
+        self.worker_id = worker_id or os.getenv("WORKER_ID") or f"{socket.gethostname()}-{os.getpid()}"
+        self.enabled = enabled if enabled is not None else os.getenv("CLUSTER_ENABLED", "0") == "1"
+        if self.enabled and not store.shared:
+            # Each worker would own a slice of wallets it can't hand over or serve to the others
+            raise ValueError(f"CLUSTER_ENABLED=1 needs a state store shared by all workers, "
+                             f"{type(store).__name__} is private to each process (use STATE_BACKEND=sqlite)")
+        self.heartbeat_interval = heartbeat_interval or float(os.getenv("WORKER_HEARTBEAT_INTERVAL", "5"))
+        self.timeout = timeout or float(os.getenv("WORKER_HEARTBEAT_TIMEOUT", "15"))
+        self.ring = HashRing([self.worker_id])
+
+    def owner(self, address: str) -> str:
+        return self.ring.owner(address) if self.enabled else self.worker_id
+
+    def owns(self, address: str) -> bool:
+        return self.owner(address) == self.worker_id
+
+    @property
+    def workers(self) -> List[str]:
+        return self.ring.workers
+
+    async def refresh(self) -> bool:
+        """Heartbeats and rebuilds the ring; True when membership changed."""
+        if not self.enabled:
+            return False
+        try:
+            await self.store.heartbeat(self.worker_id)
+            live = await self.store.live_workers(self.timeout)
+        except Exception as e:
+            print(f"Cluster heartbeat failed: {e}")
+            return False
+        # Always keep ourselves on the ring, even if our own write was late
+        members = sorted(set(live) | {self.worker_id})
+        if members == self.ring.workers:
+            return False
+        print(f"Cluster membership changed: {self.ring.workers} -> {members}")
+        self.ring = HashRing(members)
+        return True
+
+    async def settle(self, max_rounds: int = 5):
+        """
+        Waits until membership has held still for one heartbeat interval.
+        Workers started together only see each other after their first
+        heartbeats, and each would otherwise claim every wallet until then.
+        """
+        if not self.enabled:
+            return
+        for _ in range(max_rounds):
+            await asyncio.sleep(self.heartbeat_interval)
+            if not await self.refresh():
+                return
+
+    async def run(self, rebalance: Callable[[], Awaitable[None]]):
+        """
+        Runs rebalance() every heartbeat, not only on membership changes:
+        wallets added through another worker's /monitor are picked up here.
+        """
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            await self.refresh()
+            try:
+                await rebalance()
+            except Exception as e:
+                print(f"Rebalance failed: {e}")
+
+    async def stop(self):
+        if self.enabled:
+            # Leave right away instead of waiting for the timeout
+            try:
+                await self.store.remove_worker(self.worker_id)
+            except Exception as e:
+                print(f"Error leaving cluster: {e}")
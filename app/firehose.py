@@ -0,0 +1,179 @@
+import asyncio
+import json
+import os
+import re
+import time
+from typing import Callable, List, Optional, Set
+
+from .metrics import FIREHOSE_BLOCKS, FIREHOSE_SLOT_SECONDS
+from .startup import lazy_import
+
+websockets = lazy_import("websockets")
+
+# Blocks parsed but not yet scanned; the reader drops new ones beyond this
+FIREHOSE_QUEUE_SIZE = int(os.getenv("FIREHOSE_QUEUE_SIZE", "16"))
+# Time one block may take before the scan starts yielding to the event loop
+FIREHOSE_SLOT_BUDGET = float(os.getenv("FIREHOSE_SLOT_BUDGET_MS", "100")) / 1000
+
+# Quoted base58 strings of pubkey length, i.e. every candidate account key in a frame
+_CANDIDATE_KEY = re.compile(r'"([1-9A-HJ-NP-Za-km-z]{32,44})"')
+
+MatchCallback = Callable[[str, str, List[str], dict, Optional[int], float], None]
+GapCallback = Callable[[Set[str]], None]
+
+
+def transaction_keys(transaction: dict, meta: dict) -> List[str]:
+    """Account keys in balance order: static keys, then lookup-table writable and readonly ones."""
+    keys = list(transaction["message"]["accountKeys"])
+    loaded = meta.get("loadedAddresses") or {}
+    keys.extend(loaded.get("writable") or [])
+    keys.extend(loaded.get("readonly") or [])
+    return keys
+
+
+class Firehose:
+    """
+    Single blockSubscribe stream checked against the monitored set, instead
+    of three subscriptions per wallet.
+
+    Frames are pre-filtered before any JSON parsing: all quoted pubkey-shaped
+    strings are pulled out with one regex pass and intersected with the
+    monitored set. Both steps run in C and don't depend on how many wallets
+    are monitored, so blocks with no monitored account cost one scan. Only
+    the rest are parsed, and each transaction's keys are matched exactly.
+    on_match(address, signature, keys, meta, block_time, received) gets the
+    decoded transaction, so no getTransaction is needed afterwards.
+
+    Blocks missed by this stream are reported through on_gap(addresses): a
+    dropped block with the monitored wallets its prefilter matched, and a
+    reconnect with every monitored wallet, since nothing is known about the
+    blocks that went by in between.
+    """
+
+    def __init__(self, ws_urls: List[str], on_match: MatchCallback, on_gap: GapCallback,
+                 reconnect_delay: float = 5):
+        self.ws_urls = ws_urls
+        self.on_match = on_match
+        self.on_gap = on_gap
+        self.reconnect_delay = reconnect_delay
+        self.monitored: Set[str] = set()
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=FIREHOSE_QUEUE_SIZE)
+        self._tasks: List[asyncio.Task] = []
+        self.frames = 0
+        self.skipped = 0
+        self.dropped = 0
+        self.matches = 0
+        self.over_budget = 0
+        self.reconnects = 0
+        self.last_slot: Optional[int] = None
+
+    def add(self, address: str):
+        self.monitored.add(address)
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._read()), asyncio.create_task(self._process())]
+
+    def remove(self, address: str):
+        self.monitored.discard(address)
+
+    async def stop(self):
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+
+    async def _read(self):
+        failovers = 0
+        subscribed_before = False
+        while True:
+            ws_url = self.ws_urls[failovers % len(self.ws_urls)]
+            try:
+                # Blocks can be several MB
+                async with websockets.connect(ws_url, max_size=None) as websocket:
+                    await websocket.send(json.dumps({
+                        "jsonrpc": "2.0",
+                        "id": 1,
+                        "method": "blockSubscribe",
+                        "params": ["all", {
+                            "commitment": "confirmed",
+                            "encoding": "json",
+                            "transactionDetails": "full",
+                            "showRewards": False,
+                            "maxSupportedTransactionVersion": 0,
+                        }],
+                    }))
+                    print(f"Firehose subscribed on {ws_url}")
+                    if subscribed_before:
+                        # Subscribed again first, so the catch-up overlaps the new stream
+                        self.reconnects += 1
+                        self.on_gap(set(self.monitored))
+                    subscribed_before = True
+                    async for message in websocket:
+                        self._offer(message)
+                print("Firehose closed by server")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                failovers += 1
+                print(f"Firehose connection failed: {e}. Retrying in {self.reconnect_delay}s...")
+            await asyncio.sleep(self.reconnect_delay)
+
+    def _offer(self, message: str):
+        received = time.perf_counter()
+        self.frames += 1
+        candidates = self.monitored.intersection(_CANDIDATE_KEY.findall(message))
+        if not candidates:
+            self.skipped += 1
+            FIREHOSE_BLOCKS.inc(outcome="skipped")
+            return
+        try:
+            self._queue.put_nowait((message, received))
+        except asyncio.QueueFull:
+            self.dropped += 1
+            FIREHOSE_BLOCKS.inc(outcome="dropped")
+            print(f"Firehose queue full, dropping a block; catching up on {len(candidates)} wallets")
+            self.on_gap(candidates)
+
+    async def _process(self):
+        while True:
+            message, received = await self._queue.get()
+            try:
+                value = json.loads(message).get("params", {}).get("result", {}).get("value") or {}
+                if value.get("block"):
+                    self.last_slot = value.get("slot")
+                    await self._scan(value["block"], received)
+                    FIREHOSE_BLOCKS.inc(outcome="scanned")
+            except Exception as e:
+                print(f"Error scanning firehose block: {e}")
+
+    async def _scan(self, block: dict, received: float):
+        started = time.perf_counter()
+        deadline = started + FIREHOSE_SLOT_BUDGET
+        block_time = block.get("blockTime")
+        exceeded = False
+        for entry in block.get("transactions") or []:
+            meta = entry.get("meta")
+            if meta is None:
+                continue
+            keys = transaction_keys(entry["transaction"], meta)
+            for address in self.monitored.intersection(keys):
+                self.matches += 1
+                self.on_match(address, entry["transaction"]["signatures"][0], keys, meta, block_time, received)
+            if time.perf_counter() > deadline:
+                # Over budget: let notification handlers and the API run between transactions
+                exceeded = True
+                await asyncio.sleep(0)
+        if exceeded:
+            self.over_budget += 1
+        FIREHOSE_SLOT_SECONDS.observe(time.perf_counter() - started)
+
+    def stats(self) -> dict:
+        return {
+            "monitored": len(self.monitored),
+            "frames": self.frames,
+            "skipped": self.skipped,
+            "dropped": self.dropped,
+            "matches": self.matches,
+            "over_budget": self.over_budget,
+            "reconnects": self.reconnects,
+            "last_slot": self.last_slot,
+            "queued": self._queue.qsize(),
+        }
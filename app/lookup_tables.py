@@ -0,0 +1,119 @@
+import base64
+import os
+from typing import Dict, List, Optional
+
+from .cache import LRUCache
+from .rpc import solana_rpc
+from .startup import lazy_import
+
+pubkey_module = lazy_import("solders.pubkey")
+
+ADDRESS_LOOKUP_TABLE_PROGRAM = "AddressLookupTab1e1111111111111111111111111"
+# Fixed-size table header in front of the 32-byte addresses
+LOOKUP_TABLE_META_SIZE = 56
+
+
+def _static_keys(tx) -> List[str]:
+    return [str(k) for k in tx.value.transaction.transaction.message.account_keys]
+
+
+def _decode_table(account: Optional[dict]) -> Optional[List[str]]:
+    """Addresses held by a base64 lookup table account, None if it isn't one."""
+    if not account or account.get("owner") != ADDRESS_LOOKUP_TABLE_PROGRAM:
+        return None
+    data = base64.b64decode(account["data"][0])[LOOKUP_TABLE_META_SIZE:]
+    return [str(pubkey_module.Pubkey.from_bytes(data[i:i + 32])) for i in range(0, len(data) - 31, 32)]
+
+
+class LookupTableResolver:
+    """
+    Full account key lists for v0 transactions, in the order balances use:
+    static keys, then writable and readonly lookup-table addresses.
+
+    The loaded addresses normally come with the transaction meta. When a
+    node leaves them out, the tables are fetched with getMultipleAccounts
+    and kept in an LRU shared by every caller. Tables are append-only, so a
+    cached table stays valid for the indexes it holds; one that is too
+    short for a lookup is fetched again.
+    """
+
+    def __init__(self, cache_size: Optional[int] = None):
+        self.cache = LRUCache(cache_size or int(os.getenv("ALT_CACHE_SIZE", "2000")))
+        self.from_meta = 0
+        self.fetched = 0
+        self.unresolved = 0
+
+    async def account_keys(self, txs: List) -> List[List[str]]:
+        """Account keys for each transaction; tables missing from the cache are fetched together."""
+        needed: Dict[str, int] = {}
+        for tx in txs:
+            if tx.value and self._needs_tables(tx):
+                for lookup in tx.value.transaction.transaction.message.address_table_lookups:
+                    length = max([*lookup.writable_indexes, *lookup.readonly_indexes], default=-1) + 1
+                    key = str(lookup.account_key)
+                    needed[key] = max(needed.get(key, 0), length)
+        tables = await self._tables(needed) if needed else {}
+        return [self._resolve(tx, tables) if tx.value else [] for tx in txs]
+
+    def _needs_tables(self, tx) -> bool:
+        lookups = tx.value.transaction.transaction.message.address_table_lookups
+        return bool(lookups) and tx.value.transaction.meta.loaded_addresses is None
+
+    def _resolve(self, tx, tables: Dict[str, List[str]]) -> List[str]:
+        keys = _static_keys(tx)
+        lookups = tx.value.transaction.transaction.message.address_table_lookups
+        if not lookups:
+            return keys
+        loaded = tx.value.transaction.meta.loaded_addresses
+        if loaded is not None:
+            self.from_meta += 1
+            return keys + [str(k) for k in loaded.writable] + [str(k) for k in loaded.readonly]
+
+        writable: List[str] = []
+        readonly: List[str] = []
+        try:
+            for lookup in lookups:
+                table = tables[str(lookup.account_key)]
+                writable.extend(table[i] for i in lookup.writable_indexes)
+                readonly.extend(table[i] for i in lookup.readonly_indexes)
+        except (KeyError, IndexError):
+            # Closed table: static keys still line up with the first balances
+            self.unresolved += 1
+            print(f"Could not resolve lookup tables for {tx.value.transaction.transaction.signatures[0]}")
+            return keys
+        return keys + writable + readonly
+
+    async def _tables(self, needed: Dict[str, int]) -> Dict[str, List[str]]:
+        tables: Dict[str, List[str]] = {}
+        missing = []
+        for key, length in needed.items():
+            table = self.cache.lookup(key)
+            if table is not None and len(table) >= length:
+                tables[key] = table
+            else:
+                missing.append(key)
+
+        accounts = await solana_rpc.get_multiple_accounts(missing) if missing else []
+        for key, account in zip(missing, accounts):
+            table = _decode_table(account)
+            if table is not None:
+                self.fetched += 1
+                self.cache.put(key, table)
+                tables[key] = table
+        return tables
+
+    def stats(self) -> dict:
+        return {
+            "from_meta": self.from_meta,
+            "tables_fetched": self.fetched,
+            "unresolved": self.unresolved,
+            "cache": self.cache.stats(),
+        }
+
+
+lookup_tables = LookupTableResolver()
+
+
+async def resolve_account_keys(tx) -> List[str]:
+    """All account keys of one fetched transaction, lookup-table addresses included."""
+    return (await lookup_tables.account_keys([tx]))[0]
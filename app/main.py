@@ -1,8 +1,88 @@
+import time
+_import_started = time.perf_counter()
+
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from app.api import router
+from app.rpc import solana_rpc
+from app.risk import risk_db
+from app.state import state_store, cluster
+from app.watchdog import watchdog_service
+from app.alerts import alert_dispatcher
+from app.streaming import status_relay
+from app import metrics
+from app.startup import STARTUP_MODE, lazy_modules, startup_profile
+
+startup_profile.imported(_import_started)
+
+async def warmup():
+    """Loads what importing the app deferred: heavy modules, the risk index and the RPC pool."""
+    for module in lazy_modules():
+        await asyncio.to_thread(module.load)
+    with startup_profile.measure("risk index"):
+        await asyncio.to_thread(risk_db.ensure_loaded)
+    with startup_profile.measure("rpc connect"):
+        try:
+            # Opens the keep-alive connection the first real request would otherwise wait for
+            await solana_rpc.call("getSlot")
+        except Exception as e:
+            print(f"RPC warmup failed: {e}")
+    startup_profile.mark_warm()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    risk_reloader = asyncio.create_task(risk_db.watch())
+    with startup_profile.measure("state store"):
+        await state_store.start()
+    alert_dispatcher.start()
+    # Join the cluster first so restore only picks up wallets this worker owns
+    with startup_profile.measure("cluster join"):
+        await cluster.refresh()
+
+    async def restore():
+        with startup_profile.measure("restore monitors"):
+            await watchdog_service.restore_monitors()
 
-app = FastAPI(title="Watchdog API", version="1.0.0")
+    async def restore_clustered():
+        # Restore and rebalance only once every worker started alongside this one is on the ring
+        await cluster.settle()
+        await restore()
+        await cluster.run(watchdog_service.rebalance)
+
+    background = []
+    if STARTUP_MODE == "lazy":
+        # Serve right away; early requests load whatever they need on first use
+        background.append(asyncio.create_task(warmup()))
+    else:
+        with startup_profile.measure("warmup"):
+            await warmup()
+    if cluster.enabled:
+        background.append(asyncio.create_task(restore_clustered()))
+        background.append(asyncio.create_task(status_relay.run()))
+    elif STARTUP_MODE == "lazy":
+        background.append(asyncio.create_task(restore()))
+    else:
+        await restore()
+    scheduler = asyncio.create_task(watchdog_service.run_scheduler())
+    startup_profile.mark_ready()
+    print(f"Ready in {startup_profile.ready_ms:.0f}ms ({STARTUP_MODE} startup)")
+    yield
+    for task in background:
+        task.cancel()
+    risk_reloader.cancel()
+    scheduler.cancel()
+    if watchdog_service.firehose is not None:
+        await watchdog_service.firehose.stop()
+    await cluster.stop()
+    await alert_dispatcher.stop()
+    await state_store.close()
+    # Release pooled RPC connections
+    await solana_rpc.close()
+
+app = FastAPI(title="Watchdog API", version="1.0.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -18,6 +98,16 @@ app.include_router(router, prefix="/api/v1")
 def read_root():
     return {"message": "Watchdog API is running"}
 
+@app.get("/startup")
+def startup_report():
+    # Import and init timings of this process, in ms since the app import began
+    return startup_profile.report()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    # Prometheus text exposition format, scraped at the root like most exporters
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
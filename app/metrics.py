@@ -0,0 +1,155 @@
+import bisect
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Seconds; covers sub-ms cache hits up to slow RPC timeouts
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{n}="{str(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric(ABC):
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        REGISTRY.append(self)
+
+    def _key(self, labels: dict) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    @abstractmethod
+    def samples(self) -> List[str]:
+        ...
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {v}" for k, v in self._values.items()]
+
+
+class Gauge(_Metric):
+    """Set directly or computed at scrape time with set_function()."""
+    kind = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._function: Optional[Callable[[], object]] = None
+
+    def set(self, value: float, **labels):
+        self._values[self._key(labels)] = value
+
+    def set_function(self, function: Callable[[], object]):
+        """function returns a number, or a {label value tuple: number} dict for labeled gauges."""
+        self._function = function
+
+    def samples(self) -> List[str]:
+        values = dict(self._values)
+        if self._function is not None:
+            result = self._function()
+            values.update(result if isinstance(result, dict) else {(): result})
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {v}" for k, v in values.items()]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, *args, buckets: Tuple[float, ...] = DEFAULT_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [bucket counts..., +Inf count], sum
+        self._counts: Dict[Tuple[str, ...], List[int]] = {}
+        self._sums: Dict[Tuple[str, ...], float] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        counts = self._counts.get(key)
+        if counts is None:
+            counts = self._counts[key] = [0] * (len(self.buckets) + 1)
+            self._sums[key] = 0.0
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        self._sums[key] += value
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self) -> List[str]:
+        lines = []
+        for key, counts in self._counts.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound!r}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {self._sums[key]}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+REGISTRY: List[_Metric] = []
+
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    return "\n".join(metric.render() for metric in REGISTRY) + "\n"
+
+
+# Hot-path metrics shared across modules
+
+RPC_LATENCY = Histogram("watchdog_rpc_request_seconds", "JSON-RPC request latency", ("method",))
+RPC_ERRORS = Counter("watchdog_rpc_errors_total", "Failed JSON-RPC requests", ("method",))
+RPC_HEDGES = Counter("watchdog_rpc_hedged_total", "Requests duplicated to a second endpoint", ("method",))
+RPC_ENDPOINT_LATENCY = Gauge("watchdog_rpc_endpoint_latency_seconds", "Smoothed latency per RPC endpoint", ("endpoint",))
+RPC_ENDPOINT_UP = Gauge("watchdog_rpc_endpoint_up", "1 unless the endpoint is rate limited or its breaker is open", ("endpoint",))
+
+WS_RECONNECTS = Counter("watchdog_ws_reconnects_total", "PubSub connections that failed or were dropped and had to reconnect")
+WS_CONNECTIONS = Gauge("watchdog_ws_connections", "Open PubSub connections")
+WS_SUBSCRIPTIONS = Gauge("watchdog_ws_subscriptions", "Active PubSub subscriptions", ("method",))
+WS_PING_LATENCY = Gauge("watchdog_ws_ping_seconds", "Last keepalive ping round trip per connection", ("connection",))
+WS_DISPATCH_LAG = Histogram("watchdog_ws_dispatch_seconds", "Time from a PubSub message arriving to its handler returning", ("method",))
+
+NOTIFICATION_TO_ANALYSIS = Histogram(
+    "watchdog_notification_to_analysis_seconds",
+    "Time from a logsNotification arriving to its transaction being analyzed (includes ANALYSIS_DELAY)",
+    buckets=DEFAULT_BUCKETS + (30.0,),
+)
+ANALYSIS_TO_ALERT = Histogram(
+    "watchdog_analysis_to_alert_seconds",
+    "Time from an alert being raised by analysis to a sink accepting it",
+    ("sink",),
+    buckets=DEFAULT_BUCKETS + (30.0, 60.0, 120.0),
+)
+FIREHOSE_BLOCKS = Counter("watchdog_firehose_blocks_total", "Firehose block frames by outcome (skipped by the prefilter, scanned, dropped)", ("outcome",))
+FIREHOSE_SLOT_SECONDS = Histogram("watchdog_firehose_slot_seconds", "Time to scan one pre-filtered block against the monitored set")
+WALLET_TIERS = Gauge("watchdog_wallets", "Monitored wallets per tier", ("tier",))
+PENDING_TASKS = Gauge("watchdog_pending_tasks", "asyncio tasks spawned from notifications still running", ("kind",))
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 class VerificationRequest(BaseModel):
     user_wallet: str
@@ -11,16 +11,26 @@ class VerificationResponse(BaseModel):
     amount: float
     token: str = "SOL"
     mint: Optional[str] = None
+    raw_amount: Optional[str] = None # Exact amount in base units (lamports for SOL), as a string
+    decimals: Optional[int] = None
     timestamp: int
     message: str
+    # Only present when requested with ?timings=true
+    timings: Optional[Dict[str, float]] = None
+
+class BatchVerificationResponse(BaseModel):
+    results: List[VerificationResponse]
 
 class MonitorRequest(BaseModel):
     scammer_wallet: str
 
 class TokenInfo(BaseModel):
     mint: str
-    amount: float
+    amount: float # raw_amount / 10**decimals, for display
     decimals: int
+    raw_amount: str = "0" # Base units as a string, exact for any supply
+    program: str = "spl-token" # "spl-token" or "spl-token-2022"
+    symbol: Optional[str] = None
 
 class AccountInfo(BaseModel):
     sol_balance: float
@@ -34,3 +44,9 @@ class ScammerStatus(BaseModel):
     latest_activity: List[str] # Signatures
     recent_logs: List[str] = [] # Human readable alerts
     account_info: Optional[AccountInfo] = None
+    tier: str = "hot" # "hot": live subscriptions, "cold": polled
+    version: int = 0 # Bumped on every change to this wallet
+
+class BulkStatusResponse(BaseModel):
+    statuses: List[ScammerStatus]
+    missing: List[str] = [] # Requested addresses that aren't monitored
@@ -0,0 +1,242 @@
+import asyncio
+import csv
+import glob
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "data")
+DEFAULT_SOURCES = os.path.join(DATA_DIR, "risk_data.json")
+DEFAULT_INDEX_PATH = os.path.join(DATA_DIR, "risk_index.bin")
+
+# File layout: header | labels json | padding to 8 | slots
+# slot = 16 byte blake2b(address) + u32 label set id (0 = empty)
+MAGIC = b"WDRISK01"
+HEADER = struct.Struct("<8sIII")  # magic, capacity, count, meta length
+SLOT = struct.Struct("<16sI")
+MAX_LOAD = 0.6
+
+
+class RiskLabel(NamedTuple):
+    name: str
+    category: str
+    source: str
+
+
+def _digest(address: str) -> bytes:
+    return hashlib.blake2b(address.encode(), digest_size=16).digest()
+
+
+def _read_source(path: str) -> List[Tuple[str, RiskLabel]]:
+    """
+    Reads one label source. Supported formats:
+    - JSON {"name": "address"} (the original risk_data.json, treated as exchanges)
+    - JSON {"source": ..., "category": ..., "entries": {"address": "name"}}
+    - CSV with address,name[,category] rows, source taken from the file name
+    """
+    source = os.path.splitext(os.path.basename(path))[0]
+    if path.endswith(".csv"):
+        entries = []
+        with open(path, newline="") as f:
+            for row in csv.reader(f):
+                if not row or row[0].startswith("#") or row[0] == "address":
+                    continue
+                category = row[2] if len(row) > 2 else "unknown"
+                entries.append((row[0].strip(), RiskLabel(row[1].strip(), category, source)))
+        return entries
+
+    with open(path, "r") as f:
+        data = json.load(f)
+    if "entries" in data:
+        source = data.get("source", source)
+        category = data.get("category", "unknown")
+        return [(addr, RiskLabel(name, category, source)) for addr, name in data["entries"].items()]
+    return [(addr, RiskLabel(name, "exchange", source)) for name, addr in data.items()]
+
+
+class RiskIndex:
+    """
+    Open-addressing hash table over a (usually memory-mapped) buffer.
+    Lookups hash the address and probe a handful of fixed-size slots, so the
+    cost stays flat no matter how many addresses are labeled.
+    """
+
+    def __init__(self, buffer, fingerprint: Optional[list] = None):
+        if len(buffer) < HEADER.size:
+            raise ValueError("Not a risk index file")
+        magic, self.capacity, self.count, meta_len = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC:
+            raise ValueError("Not a risk index file")
+        offset = (HEADER.size + meta_len + 7) & ~7
+        if len(buffer) != offset + self.capacity * SLOT.size:
+            # A truncated or half-written file would send lookups past the end
+            raise ValueError("Risk index size doesn't match its header")
+        meta = json.loads(bytes(buffer[HEADER.size:HEADER.size + meta_len]))
+        self.labels = [RiskLabel(*label) for label in meta["labels"]]
+        self.label_sets = [tuple(self.labels[i] for i in label_set) for label_set in meta["sets"]]
+        self.fingerprint = meta.get("fingerprint") if fingerprint is None else fingerprint
+        self._offset = offset
+        self._mask = self.capacity - 1
+        self._buffer = buffer
+
+    def __len__(self) -> int:
+        return self.count
+
+    def lookup(self, address: str) -> Tuple[RiskLabel, ...]:
+        key = _digest(address)
+        i = int.from_bytes(key[:8], "little") & self._mask
+        while True:
+            slot_key, set_id = SLOT.unpack_from(self._buffer, self._offset + i * SLOT.size)
+            if set_id == 0:
+                return ()
+            if slot_key == key:
+                return self.label_sets[set_id - 1]
+            i = (i + 1) & self._mask
+
+    @staticmethod
+    def build(entries: List[Tuple[str, RiskLabel]], fingerprint: Optional[list] = None) -> bytearray:
+        by_address: Dict[str, List[int]] = {}
+        label_ids: Dict[RiskLabel, int] = {}
+        for address, label in entries:
+            label_id = label_ids.setdefault(label, len(label_ids))
+            ids = by_address.setdefault(address, [])
+            if label_id not in ids:
+                ids.append(label_id)
+
+        set_ids: Dict[Tuple[int, ...], int] = {}
+        capacity = 8
+        while capacity * MAX_LOAD < len(by_address):
+            capacity *= 2
+
+        # Label sets are only known after this pass, so slots come before the header
+        slots = bytearray(capacity * SLOT.size)
+        mask = capacity - 1
+        for address, ids in by_address.items():
+            set_id = set_ids.setdefault(tuple(ids), len(set_ids)) + 1
+            key = _digest(address)
+            i = int.from_bytes(key[:8], "little") & mask
+            while SLOT.unpack_from(slots, i * SLOT.size)[1] != 0:
+                i = (i + 1) & mask
+            SLOT.pack_into(slots, i * SLOT.size, key, set_id)
+
+        meta = json.dumps({
+            "labels": [list(label) for label in label_ids],
+            "sets": [list(s) for s in set_ids],
+            "fingerprint": fingerprint,
+        }).encode()
+        offset = (HEADER.size + len(meta) + 7) & ~7
+        out = bytearray(offset)
+        HEADER.pack_into(out, 0, MAGIC, capacity, len(by_address), len(meta))
+        out[HEADER.size:HEADER.size + len(meta)] = meta
+        out += slots
+        return out
+
+
+class RiskDatabase:
+    """
+    Holds the current RiskIndex and rebuilds it when a source file changes.
+    The compiled index is written next to the data and memory-mapped, so a
+    restart with unchanged sources doesn't parse anything. Reloads build a new
+    index off the event loop and swap it in with a single assignment.
+    """
+
+    def __init__(self, sources: Optional[str] = None, index_path: Optional[str] = None,
+                 reload_interval: Optional[float] = None):
+        self.sources = sources or os.getenv("RISK_SOURCES", DEFAULT_SOURCES)
+        self.index_path = index_path or os.getenv("RISK_INDEX_PATH", DEFAULT_INDEX_PATH)
+        self.reload_interval = reload_interval or float(os.getenv("RISK_RELOAD_INTERVAL", "30"))
+        self.index: Optional[RiskIndex] = None
+
+    def source_files(self) -> List[str]:
+        paths = []
+        for pattern in self.sources.split(","):
+            paths.extend(sorted(glob.glob(pattern.strip())))
+        return paths
+
+    def fingerprint(self) -> list:
+        fp = []
+        for path in self.source_files():
+            st = os.stat(path)
+            fp.append([os.path.abspath(path), st.st_mtime_ns, st.st_size])
+        return fp
+
+    def _open_compiled(self, fingerprint: list) -> Optional[RiskIndex]:
+        try:
+            with open(self.index_path, "rb") as f:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            index = RiskIndex(buffer)
+        except (OSError, ValueError):
+            return None
+        return index if index.fingerprint == fingerprint else None
+
+    def _load(self) -> RiskIndex:
+        fingerprint = self.fingerprint()
+        index = self._open_compiled(fingerprint)
+        if index is not None:
+            return index
+
+        entries = []
+        for path in self.source_files():
+            try:
+                entries.extend(_read_source(path))
+            except Exception as e:
+                print(f"Warning: Could not load risk data from {path}: {e}")
+        data = RiskIndex.build(entries, fingerprint)
+
+        tmp_path = None
+        try:
+            # Private temp file: every worker rebuilds when the sources change
+            fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(self.index_path) + ".",
+                                            suffix=".tmp", dir=os.path.dirname(self.index_path) or ".")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, self.index_path)
+            tmp_path = None
+            index = self._open_compiled(fingerprint)
+        except OSError as e:
+            print(f"Warning: Could not write risk index {self.index_path}: {e}")
+        finally:
+            if tmp_path is not None:
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
+        if index is None:
+            index = RiskIndex(data, fingerprint)
+        print(f"Loaded risk index: {len(index)} addresses, {len(index.labels)} labels")
+        return index
+
+    def ensure_loaded(self) -> RiskIndex:
+        if self.index is None:
+            self.index = self._load()
+        return self.index
+
+    def lookup(self, address: str) -> Tuple[RiskLabel, ...]:
+        return self.ensure_loaded().lookup(address)
+
+    async def watch(self):
+        """Polls the sources and hot-swaps the index when they change."""
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            try:
+                index = self.index
+                if index is None or index.fingerprint == self.fingerprint():
+                    # Not loaded yet (first lookup will do it) or unchanged
+                    continue
+                self.index = await asyncio.to_thread(self._load)
+            except Exception as e:
+                print(f"Risk index reload failed: {e}")
+
+
+risk_db = RiskDatabase()
+
+
+if __name__ == "__main__":
+    # python -m app.risk [sources]  -> compile the index ahead of deploy
+    db = RiskDatabase(sys.argv[1] if len(sys.argv) > 1 else None)
+    db.ensure_loaded()
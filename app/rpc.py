@@ -0,0 +1,362 @@
+import asyncio
+import itertools
+import json
+import os
+import time
+from typing import TYPE_CHECKING, Any, List, Optional, Tuple
+
+from .metrics import RPC_ENDPOINT_LATENCY, RPC_ENDPOINT_UP, RPC_ERRORS, RPC_HEDGES, RPC_LATENCY
+from .startup import lazy_import
+
+if TYPE_CHECKING:
+    import httpx
+    from solders.rpc.responses import GetBalanceResp, GetTokenAccountsByOwnerJsonParsedResp, GetTransactionResp
+
+# Loaded on first use or by the startup warmup, they dominate import time
+httpx = lazy_import("httpx")  # noqa: F811
+responses = lazy_import("solders.rpc.responses")
+
+DEFAULT_RPC_URL = "https://api.mainnet-beta.solana.com"
+
+# getMultipleAccounts accepts at most 100 keys
+MULTIPLE_ACCOUNTS_LIMIT = 100
+
+
+class RPCError(Exception):
+    """Raised when the node answers with a JSON-RPC error object."""
+
+    def __init__(self, method: str, error: dict):
+        self.method = method
+        self.code = error.get("code")
+        super().__init__(f"{method} failed: {error.get('message', error)}")
+
+
+class Endpoint:
+    """
+    Health of one RPC URL: latency and error rate (EWMA), plus a block that
+    is set by 429s (Retry-After) and by the circuit breaker.
+    """
+
+    def __init__(self, url: str):
+        self.url = url
+        self.latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.failures = 0  # consecutive
+        self.blocked_until = 0.0
+        self.in_flight = 0
+        self.requests = 0
+        self.errors = 0
+        self.throttled = 0
+
+    def available(self, now: float) -> bool:
+        return now >= self.blocked_until
+
+    def score(self) -> float:
+        # Untried endpoints score 0 so each one gets measured
+        return (self.latency or 0.0) / max(0.05, 1.0 - self.error_rate)
+
+    def record_success(self, latency: float):
+        self.requests += 1
+        self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+        self.error_rate *= 0.8
+        self.failures = 0
+
+    def record_failure(self, threshold: int, cooldown: float):
+        self.requests += 1
+        self.errors += 1
+        self.error_rate = 0.8 * self.error_rate + 0.2
+        self.failures += 1
+        if self.failures >= threshold:
+            # Open; once the cooldown passes the next request is the trial, and
+            # a failure re-opens it straight away since failures stays high
+            self.blocked_until = time.monotonic() + cooldown
+            print(f"RPC endpoint {self.url} failing, skipped for {cooldown:g}s")
+
+    def throttle(self, retry_after: float):
+        self.throttled += 1
+        self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+
+    def stats(self) -> dict:
+        return {
+            "url": self.url,
+            "latency_ms": round(self.latency * 1000, 2) if self.latency is not None else None,
+            "error_rate": round(self.error_rate, 3),
+            "available": self.available(time.monotonic()),
+            "in_flight": self.in_flight,
+            "requests": self.requests,
+            "errors": self.errors,
+            "throttled": self.throttled,
+        }
+
+
+def _retryable(error: Exception) -> bool:
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code == 429 or error.response.status_code >= 500
+    return isinstance(error, httpx.TransportError)
+
+
+def endpoint_urls(list_name: str, single_name: str, default: str) -> List[str]:
+    """Comma-separated list from list_name, else the single URL variable."""
+    urls = [u.strip() for u in os.getenv(list_name, "").split(",") if u.strip()]
+    return urls or [os.getenv(single_name, default)]
+
+
+class SolanaRPC:
+    """
+    Shared async JSON-RPC client.
+    One keep-alive connection pool for the whole process, with a cap on
+    in-flight requests so a burst of notifications can't flood the node.
+    Typed helpers return the same solders response objects as solana-py's Client.
+
+    Requests go to the healthiest of the configured endpoints and are retried
+    on another one after a 429, 5xx or connection error. getTransaction is
+    hedged: if the first endpoint hasn't answered within hedge_after, the
+    same request goes to a second one and whichever answers first wins.
+    """
+
+    def __init__(self, urls: Optional[List[str]] = None, max_connections: Optional[int] = None,
+                 max_concurrency: Optional[int] = None, timeout: Optional[float] = None,
+                 hedge_after: Optional[float] = None):
+        self.endpoints = [Endpoint(url) for url in urls or endpoint_urls("SOLANA_RPC_URLS", "SOLANA_RPC_URL", DEFAULT_RPC_URL)]
+        self.max_connections = max_connections or int(os.getenv("RPC_MAX_CONNECTIONS", "20"))
+        self.max_concurrency = max_concurrency or int(os.getenv("RPC_MAX_CONCURRENCY", "50"))
+        self.timeout = timeout or float(os.getenv("RPC_TIMEOUT", "10"))
+        self.hedge_after = hedge_after if hedge_after is not None else float(os.getenv("RPC_HEDGE_AFTER", "0.5"))
+        self.max_attempts = int(os.getenv("RPC_MAX_ATTEMPTS", "3"))
+        self.breaker_threshold = int(os.getenv("RPC_BREAKER_THRESHOLD", "5"))
+        self.breaker_cooldown = float(os.getenv("RPC_BREAKER_COOLDOWN", "30"))
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._session: "Optional[httpx.AsyncClient]" = None
+        self._request_ids = itertools.count(1)
+        RPC_ENDPOINT_LATENCY.set_function(lambda: {
+            (e.url,): e.latency for e in self.endpoints if e.latency is not None
+        })
+        RPC_ENDPOINT_UP.set_function(lambda: {
+            (e.url,): int(e.available(time.monotonic())) for e in self.endpoints
+        })
+
+    @property
+    def url(self) -> str:
+        """Endpoint the next request would go to."""
+        return self._choose(set()).url
+
+    @property
+    def session(self) -> "httpx.AsyncClient":
+        # Created lazily so the pool binds to the running event loop
+        if self._session is None or self._session.is_closed:
+            self._session = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.timeout),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+                headers={"Content-Type": "application/json"},
+            )
+        return self._session
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.aclose()
+            self._session = None
+
+    def _choose(self, exclude: set) -> Endpoint:
+        """Best available endpoint not in exclude; the one unblocked soonest if none is available."""
+        now = time.monotonic()
+        candidates = [e for e in self.endpoints if e not in exclude] or self.endpoints
+        available = [e for e in candidates if e.available(now)]
+        if not available:
+            return min(candidates, key=lambda e: e.blocked_until)
+        return min(available, key=Endpoint.score)
+
+    async def _send(self, endpoint: Endpoint, content: str, method: str) -> Any:
+        """One attempt against one endpoint, updating its health."""
+        wait = endpoint.blocked_until - time.monotonic()
+        if wait > 0:
+            # Everything is blocked; honour the shortest Retry-After/cooldown
+            await asyncio.sleep(min(wait, self.timeout))
+        async with self._semaphore:
+            # Timed once a slot is free, so queueing behind the semaphore isn't counted as node latency
+            started = time.perf_counter()
+            endpoint.in_flight += 1
+            try:
+                response = await self.session.post(endpoint.url, content=content)
+                response.raise_for_status()
+            except Exception as e:
+                RPC_ERRORS.inc(method=method)
+                if isinstance(e, httpx.HTTPStatusError) and e.response.status_code == 429:
+                    try:
+                        retry_after = float(e.response.headers.get("Retry-After", "1"))
+                    except ValueError:
+                        retry_after = 1.0  # HTTP-date form, not worth parsing
+                    endpoint.throttle(retry_after)
+                elif _retryable(e):
+                    endpoint.record_failure(self.breaker_threshold, self.breaker_cooldown)
+                raise
+            finally:
+                endpoint.in_flight -= 1
+                RPC_LATENCY.observe(time.perf_counter() - started, method=method)
+        endpoint.record_success(time.perf_counter() - started)
+        return response.json()
+
+    async def _post(self, payload: Any, method: str, first: Optional[Endpoint] = None) -> Any:
+        content = json.dumps(payload)
+        tried: set = set()
+        endpoint = first or self._choose(tried)
+        for attempt in range(self.max_attempts):
+            try:
+                return await self._send(endpoint, content, method)
+            except Exception as e:
+                if not _retryable(e) or attempt == self.max_attempts - 1:
+                    raise
+            tried.add(endpoint)
+            endpoint = self._choose(tried)
+
+    async def _hedged_post(self, payload: Any, method: str, usable=lambda body: True) -> Any:
+        """
+        _post, plus a second copy on another endpoint if the first is slower
+        than hedge_after. A body failing usable() (e.g. a node that hasn't
+        seen the transaction yet) only wins if nothing better arrives.
+        """
+        primary = self._choose(set())
+        if self.hedge_after <= 0 or len(self.endpoints) < 2:
+            return await self._post(payload, method, primary)
+
+        pending = {asyncio.create_task(self._post(payload, method, primary))}
+        hedged = False
+        fallback, error = None, None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, timeout=None if hedged else self.hedge_after, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is not None:
+                        error = task.exception()
+                    elif usable(task.result()):
+                        return task.result()
+                    else:
+                        fallback = task.result()
+                # Hedge on slowness or an unusable answer; errors were already retried by _post
+                if not hedged and (pending or fallback is not None):
+                    hedged = True
+                    secondary = self._choose({primary})
+                    if secondary is not primary:
+                        RPC_HEDGES.inc(method=method)
+                        pending.add(asyncio.create_task(self._post(payload, method, secondary)))
+        finally:
+            for task in pending:
+                task.cancel()
+        if fallback is not None:
+            return fallback
+        raise error
+
+    async def request(self, method: str, params: Optional[list] = None, hedge: bool = False) -> dict:
+        """Sends a single request and returns the raw JSON-RPC response body."""
+        payload = {
+            "jsonrpc": "2.0",
+            "id": next(self._request_ids),
+            "method": method,
+            "params": params or [],
+        }
+        if hedge:
+            body = await self._hedged_post(payload, method, lambda body: body.get("result") is not None)
+        else:
+            body = await self._post(payload, method)
+        if "error" in body:
+            RPC_ERRORS.inc(method=method)
+            raise RPCError(method, body["error"])
+        return body
+
+    def stats(self) -> List[dict]:
+        return [endpoint.stats() for endpoint in self.endpoints]
+
+    async def call(self, method: str, params: Optional[list] = None) -> Any:
+        return (await self.request(method, params))["result"]
+
+    async def batch(self, calls: List[Tuple[str, list]], hedge: bool = False) -> List[dict]:
+        """
+        Sends several requests as one JSON-RPC batch.
+        Returns the raw response bodies in call order; per-call errors are left
+        in the body for the caller to inspect.
+        """
+        if not calls:
+            return []
+        ids = [next(self._request_ids) for _ in calls]
+        payload = [
+            {"jsonrpc": "2.0", "id": request_id, "method": method, "params": params}
+            for request_id, (method, params) in zip(ids, calls)
+        ]
+        if hedge:
+            bodies = await self._hedged_post(payload, "batch:" + calls[0][0], lambda bodies: isinstance(bodies, list)
+                                             and all(body.get("result") is not None for body in bodies))
+        else:
+            bodies = await self._post(payload, "batch:" + calls[0][0])
+        if isinstance(bodies, dict):
+            # Whole batch rejected (e.g. batching disabled on the endpoint)
+            raise RPCError("batch", bodies.get("error", {}))
+        by_id = {body.get("id"): body for body in bodies}
+        return [by_id.get(request_id, {"error": {"message": "No response in batch"}}) for request_id in ids]
+
+    async def get_signature_statuses(self, signatures: List[str]) -> List[Optional[dict]]:
+        """Statuses for up to 256 signatures, None for unknown ones."""
+        result = await self.call("getSignatureStatuses", [signatures, {"searchTransactionHistory": True}])
+        return result["value"]
+
+    async def get_signatures_for_address(self, address: str, limit: int = 1000, before: Optional[str] = None,
+                                         until: Optional[str] = None, commitment: str = "confirmed") -> List[dict]:
+        """Newest-first signature infos (signature, slot, err, blockTime)."""
+        config = {"limit": limit, "commitment": commitment}
+        if before:
+            config["before"] = before
+        if until:
+            config["until"] = until
+        return await self.call("getSignaturesForAddress", [address, config])
+
+    async def get_transactions(self, signatures: List[str], commitment: str = "confirmed") -> "List[GetTransactionResp]":
+        """Batched getTransaction, a failed entry comes back as an empty response."""
+        bodies = await self.batch([
+            ("getTransaction", [sig, {"encoding": "json", "maxSupportedTransactionVersion": 0, "commitment": commitment}])
+            for sig in signatures
+        ], hedge=True)
+        results = []
+        for sig, body in zip(signatures, bodies):
+            if "error" in body:
+                print(f"getTransaction {sig} failed in batch: {body['error']}")
+                results.append(responses.GetTransactionResp(None))
+            else:
+                results.append(responses.GetTransactionResp.from_json(json.dumps(body)))
+        return results
+
+    async def get_transaction(self, signature: str, commitment: str = "confirmed") -> "GetTransactionResp":
+        body = await self.request("getTransaction", [
+            signature,
+            {"encoding": "json", "maxSupportedTransactionVersion": 0, "commitment": commitment},
+        ], hedge=True)
+        return responses.GetTransactionResp.from_json(json.dumps(body))
+
+    async def get_multiple_accounts(self, addresses: List[str], encoding: str = "base64",
+                                    commitment: str = "confirmed") -> List[Optional[dict]]:
+        """Raw account values in address order, None for missing accounts."""
+        chunks = [addresses[i:i + MULTIPLE_ACCOUNTS_LIMIT] for i in range(0, len(addresses), MULTIPLE_ACCOUNTS_LIMIT)]
+        results = await asyncio.gather(*(
+            self.call("getMultipleAccounts", [chunk, {"encoding": encoding, "commitment": commitment}])
+            for chunk in chunks
+        ))
+        return [account for result in results for account in result["value"]]
+
+    async def get_balance(self, address: str, commitment: str = "confirmed") -> "GetBalanceResp":
+        body = await self.request("getBalance", [address, {"commitment": commitment}])
+        return responses.GetBalanceResp.from_json(json.dumps(body))
+
+    async def get_token_accounts_by_owner(self, owner: str, program_id: str,
+                                          commitment: str = "confirmed") -> "GetTokenAccountsByOwnerJsonParsedResp":
+        body = await self.request("getTokenAccountsByOwner", [
+            owner,
+            {"programId": program_id},
+            {"encoding": "jsonParsed", "commitment": commitment},
+        ])
+        return responses.GetTokenAccountsByOwnerJsonParsedResp.from_json(json.dumps(body))
+
+
+# Shared by verification, forensics and the watchdog
+solana_rpc = SolanaRPC()
@@ -0,0 +1,93 @@
+import importlib
+import os
+import time
+from contextlib import contextmanager
+from types import ModuleType
+from typing import List, Optional
+
+# "eager": finish warmup before serving. "lazy": serve straight away and warm
+# up in the background, so the first requests may pay for what isn't loaded yet.
+STARTUP_MODE = os.getenv("STARTUP_MODE", "eager")
+
+
+class StartupProfile:
+    """Import and initialization steps with their durations, for GET /startup."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: List[dict] = []
+        self.ready_ms: Optional[float] = None
+        self.warm_ms: Optional[float] = None
+
+    def _since_start(self) -> float:
+        return round((time.perf_counter() - self.started) * 1000, 2)
+
+    def imported(self, started: float):
+        """Records the app import, begun at `started`, and measures everything else from there."""
+        self.started = started
+        self.record("import app.main", time.perf_counter() - started)
+
+    def record(self, phase: str, seconds: float):
+        self.phases.append({"phase": phase, "ms": round(seconds * 1000, 2), "at_ms": self._since_start()})
+
+    @contextmanager
+    def measure(self, phase: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(phase, time.perf_counter() - started)
+
+    def mark_ready(self):
+        """The server accepts requests from here on."""
+        self.ready_ms = self._since_start()
+
+    def mark_warm(self):
+        """Everything deferred at import time has been loaded."""
+        self.warm_ms = self._since_start()
+
+    def report(self) -> dict:
+        return {
+            "mode": STARTUP_MODE,
+            "ready_ms": self.ready_ms,
+            "warm_ms": self.warm_ms,
+            "phases": self.phases,
+        }
+
+
+startup_profile = StartupProfile()
+
+
+class LazyModule:
+    """
+    Stands in for a heavy module until one of its attributes is first used,
+    so importing the app doesn't pay for it. load() does the import up front,
+    which is what the warmup calls.
+    """
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module: Optional[ModuleType] = None
+
+    def load(self) -> ModuleType:
+        if self._module is None:
+            with startup_profile.measure(f"import {self._name}"):
+                self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr: str):
+        return getattr(self.load(), attr)
+
+
+# Shared so each module is only timed once, whoever touches it first
+_lazy_modules: dict = {}
+
+
+def lazy_import(name: str) -> LazyModule:
+    if name not in _lazy_modules:
+        _lazy_modules[name] = LazyModule(name)
+    return _lazy_modules[name]
+
+
+def lazy_modules() -> List[LazyModule]:
+    return list(_lazy_modules.values())
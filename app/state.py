@@ -1,5 +1,71 @@
-from typing import Dict
-from .models import ScammerStatus
+import asyncio
+import os
+from collections import OrderedDict
+from typing import Dict, List, Optional
+from .activity import WalletState
+from .store import create_store
+from .cluster import Cluster
 
-# In-memory store for scammer status
-scammer_db: Dict[str, ScammerStatus] = {}
+# In-memory cache of scammer status, state_store is the source of truth.
+# Only wallets owned by this worker are cached; others are read through.
+scammer_db: Dict[str, WalletState] = {}
+
+state_store = create_store()
+cluster = Cluster(state_store)
+
+# Wallets owned by other workers, as last read from the store. Reused while
+# their stored version is unchanged, along with their serialized snapshot.
+_remote: "OrderedDict[str, WalletState]" = OrderedDict()
+REMOTE_STATUS_CACHE_SIZE = int(os.getenv("REMOTE_STATUS_CACHE_SIZE", "10000"))
+
+async def get_status(address: str) -> Optional[WalletState]:
+    """Cached status, loaded from the store on first access."""
+    status = scammer_db.get(address)
+    if status is not None:
+        return status
+    if not cluster.owns(address):
+        return await _get_remote_status(address)
+    status = await state_store.load(address)
+    if status is not None:
+        scammer_db[address] = status
+    return status
+
+async def get_statuses(addresses: List[str]) -> List[Optional[WalletState]]:
+    """get_status for many wallets, checking every cached remote one in a single versions() query."""
+    remote = {a for a in addresses if a not in scammer_db and not cluster.owns(a)}
+    cached = [a for a in remote if a in _remote]
+    versions = await state_store.versions(cached) if cached else {}
+    return list(await asyncio.gather(*(
+        _get_remote_status(a, versions) if a in remote else get_status(a) for a in addresses
+    )))
+
+async def _get_remote_status(address: str, versions: Optional[Dict[str, int]] = None) -> Optional[WalletState]:
+    """versions, when given, already holds the stored version of this address if it has one."""
+    cached = _remote.get(address)
+    if cached is not None:
+        if versions is None:
+            versions = await state_store.versions([address])
+        if versions.get(address) == cached.version:
+            _remote.move_to_end(address)
+            return cached
+    status = await state_store.load(address)
+    if status is None:
+        _remote.pop(address, None)
+        return None
+    _remote[address] = status
+    _remote.move_to_end(address)
+    while len(_remote) > REMOTE_STATUS_CACHE_SIZE:
+        _remote.popitem(last=False)
+    return status
+
+def put_status(status: WalletState):
+    if cluster.owns(status.address):
+        scammer_db[status.address] = status
+    state_store.save(status)
+
+def mark_dirty(address: str):
+    """Call after mutating a cached status so the change gets persisted and served."""
+    status = scammer_db.get(address)
+    if status is not None:
+        status.touch()
+        state_store.save(status)
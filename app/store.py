@@ -0,0 +1,264 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional
+
+from .activity import WalletState
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "watchdog.db")
+
+
+class StateStore(ABC):
+    """
+    Durable home of wallet state. scammer_db in state.py is a cache in front of it.
+    save() must be cheap: it is called from notification handlers.
+    """
+
+    # Whether other worker processes see the same data, as CLUSTER_ENABLED needs
+    shared = True
+
+    async def start(self):
+        pass
+
+    async def close(self):
+        pass
+
+    @abstractmethod
+    async def load(self, address: str) -> Optional[WalletState]:
+        ...
+
+    @abstractmethod
+    async def active_addresses(self) -> List[str]:
+        ...
+
+    @abstractmethod
+    async def versions(self, addresses: List[str]) -> Dict[str, int]:
+        """Stored version of each address, without loading the state; unknown ones are left out."""
+
+    @abstractmethod
+    def save(self, status: WalletState):
+        ...
+
+    @abstractmethod
+    def set_active(self, address: str, active: bool):
+        ...
+
+    async def flush(self):
+        """Writes out anything save()/set_active() are still holding back."""
+
+    # Worker membership, see cluster.py
+
+    @abstractmethod
+    async def heartbeat(self, worker_id: str):
+        ...
+
+    @abstractmethod
+    async def live_workers(self, timeout: float) -> List[str]:
+        ...
+
+    @abstractmethod
+    async def remove_worker(self, worker_id: str):
+        ...
+
+
+class MemoryStateStore(StateStore):
+    """Non-durable backend, keeps the old in-process behaviour."""
+
+    shared = False
+
+    def __init__(self):
+        self._data: Dict[str, WalletState] = {}
+        self._active: Dict[str, bool] = {}
+        self._workers: Dict[str, float] = {}
+
+    async def load(self, address: str) -> Optional[WalletState]:
+        return self._data.get(address)
+
+    async def active_addresses(self) -> List[str]:
+        return [address for address, active in self._active.items() if active]
+
+    async def versions(self, addresses: List[str]) -> Dict[str, int]:
+        return {address: self._data[address].version for address in addresses if address in self._data}
+
+    def save(self, status: WalletState):
+        self._data[status.address] = status
+
+    def set_active(self, address: str, active: bool):
+        self._active[address] = active
+
+    async def heartbeat(self, worker_id: str):
+        self._workers[worker_id] = time.time()
+
+    async def live_workers(self, timeout: float) -> List[str]:
+        cutoff = time.time() - timeout
+        return [worker for worker, seen in self._workers.items() if seen >= cutoff]
+
+    async def remove_worker(self, worker_id: str):
+        self._workers.pop(worker_id, None)
+
+
+class SQLiteStateStore(StateStore):
+    """
+    SQLite (WAL) backend with write-behind batching.
+    save() only records the wallet as dirty; a background task serializes
+    all dirty wallets every flush_interval and writes them in one transaction
+    on a worker thread. A crash loses at most one interval of updates.
+    The file can be shared by several worker processes.
+    """
+
+    def __init__(self, path: Optional[str] = None, flush_interval: Optional[float] = None):
+        self.path = path or os.getenv("STATE_DB_PATH", DEFAULT_DB_PATH)
+        self.flush_interval = flush_interval or float(os.getenv("STATE_FLUSH_INTERVAL", "1"))
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._dirty: Dict[str, WalletState] = {}
+        self._dirty_active: Dict[str, bool] = {}
+        self._flusher: Optional[asyncio.Task] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS wallets ("
+                " address TEXT PRIMARY KEY,"
+                " data TEXT NOT NULL,"
+                " active INTEGER NOT NULL DEFAULT 1,"
+                " updated_at REAL NOT NULL,"
+                " version INTEGER NOT NULL DEFAULT 0)"
+            )
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(wallets)")]
+            if "version" not in columns:
+                # Files from before versions were stored; filled in as wallets are written
+                conn.execute("ALTER TABLE wallets ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS workers ("
+                " worker_id TEXT PRIMARY KEY,"
+                " heartbeat REAL NOT NULL)"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _query(self, sql: str, params: tuple = ()) -> list:
+        with self._lock:
+            return self._connect().execute(sql, params).fetchall()
+
+    async def start(self):
+        await asyncio.to_thread(self._connect)
+        if self._flusher is None:
+            self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def close(self):
+        if self._flusher is not None:
+            self._flusher.cancel()
+            self._flusher = None
+        await self.flush()
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    async def load(self, address: str) -> Optional[WalletState]:
+        rows = await asyncio.to_thread(self._query, "SELECT data FROM wallets WHERE address = ?", (address,))
+        if not rows:
+            return None
+        return WalletState.from_json(rows[0][0])
+
+    async def active_addresses(self) -> List[str]:
+        rows = await asyncio.to_thread(self._query, "SELECT address FROM wallets WHERE active = 1")
+        return [row[0] for row in rows]
+
+    async def versions(self, addresses: List[str]) -> Dict[str, int]:
+        found: Dict[str, int] = {}
+        # Stays under SQLite's bound parameter limit
+        for start in range(0, len(addresses), 500):
+            chunk = addresses[start:start + 500]
+            rows = await asyncio.to_thread(
+                self._query,
+                f"SELECT address, version FROM wallets WHERE address IN ({','.join('?' * len(chunk))})",
+                tuple(chunk),
+            )
+            found.update(rows)
+        return found
+
+    def save(self, status: WalletState):
+        self._dirty[status.address] = status
+
+    def set_active(self, address: str, active: bool):
+        self._dirty_active[address] = active
+
+    def _execute(self, sql: str, params: tuple = ()):
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute(sql, params)
+
+    async def heartbeat(self, worker_id: str):
+        await asyncio.to_thread(
+            self._execute,
+            "INSERT INTO workers (worker_id, heartbeat) VALUES (?, ?) "
+            "ON CONFLICT(worker_id) DO UPDATE SET heartbeat = excluded.heartbeat",
+            (worker_id, time.time()),
+        )
+
+    async def live_workers(self, timeout: float) -> List[str]:
+        rows = await asyncio.to_thread(
+            self._query, "SELECT worker_id FROM workers WHERE heartbeat >= ?", (time.time() - timeout,)
+        )
+        return [row[0] for row in rows]
+
+    async def remove_worker(self, worker_id: str):
+        await asyncio.to_thread(self._execute, "DELETE FROM workers WHERE worker_id = ?", (worker_id,))
+
+    def _write(self, rows: list, active_rows: list):
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.executemany(
+                    "INSERT INTO wallets (address, data, updated_at, version) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(address) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at,"
+                    " version = excluded.version",
+                    rows,
+                )
+                conn.executemany("UPDATE wallets SET active = ? WHERE address = ?", active_rows)
+
+    async def flush(self):
+        if not self._dirty and not self._dirty_active:
+            return
+        dirty, self._dirty = self._dirty, {}
+        dirty_active, self._dirty_active = self._dirty_active, {}
+        now = time.time()
+        # Serialize on the loop so the thread never sees a half-updated model
+        rows = [(address, status.to_json(), now, status.version) for address, status in dirty.items()]
+        active_rows = [(int(active), address) for address, active in dirty_active.items()]
+        try:
+            await asyncio.to_thread(self._write, rows, active_rows)
+        except Exception:
+            # Keep the batch for the next attempt unless newer state arrived meanwhile
+            for address, status in dirty.items():
+                self._dirty.setdefault(address, status)
+            for address, active in dirty_active.items():
+                self._dirty_active.setdefault(address, active)
+            raise
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"State flush failed: {e}")
+
+
+def create_store() -> StateStore:
+    backend = os.getenv("STATE_BACKEND", "sqlite")
+    if backend == "memory":
+        return MemoryStateStore()
+    if backend == "sqlite":
+        return SQLiteStateStore()
+    raise ValueError(f"Unknown STATE_BACKEND: {backend}")
@@ -0,0 +1,167 @@
+import asyncio
+import json
+import os
+from typing import Dict, Iterable, List, Optional, Set
+
+from .state import cluster, state_store
+
+# Events buffered per client before it is considered too slow and dropped
+STREAM_QUEUE_SIZE = int(os.getenv("STREAM_QUEUE_SIZE", "256"))
+# Seconds between store checks for followed wallets owned by other workers
+STREAM_RELAY_INTERVAL = float(os.getenv("STREAM_RELAY_INTERVAL", "1"))
+
+
+class StreamClient:
+    """One connected dashboard: the wallets it follows and its outgoing queue."""
+    __slots__ = ("queue", "addresses", "dropped")
+
+    def __init__(self, queue_size: int = STREAM_QUEUE_SIZE):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max(2, queue_size))
+        self.addresses: Set[str] = set()
+        self.dropped = False
+
+    def offer(self, message: str) -> bool:
+        """Queues without waiting; False when the queue is full."""
+        if self.dropped:
+            return False
+        try:
+            self.queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    async def get(self) -> Optional[str]:
+        """Next message to send, None once the client has been dropped."""
+        return await self.queue.get()
+
+    def end(self, notice: Optional[str] = None):
+        """Discards anything queued and ends the stream, after an optional last message."""
+        self.dropped = True
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        if notice is not None:
+            self.queue.put_nowait(notice)
+        self.queue.put_nowait(None)
+
+
+class StatusBroadcaster:
+    """
+    Fans wallet deltas out to subscribed clients.
+
+    publish() is called from the watchdog's notification path, so it never
+    waits: each event is serialized once and put on every subscriber's
+    bounded queue, and a client whose queue is full is disconnected instead
+    of holding anything up. Each connection drains its own queue.
+    """
+
+    def __init__(self):
+        self._subscribers: Dict[str, Set[StreamClient]] = {}
+        self.clients: Set[StreamClient] = set()
+        self.published = 0
+        self.dropped = 0
+
+    def connect(self) -> StreamClient:
+        client = StreamClient()
+        self.clients.add(client)
+        return client
+
+    def disconnect(self, client: StreamClient):
+        self.unsubscribe(client, list(client.addresses))
+        self.clients.discard(client)
+
+    def subscribe(self, client: StreamClient, address: str, snapshot: Optional[dict] = None):
+        """The snapshot, if any, is queued ahead of every later delta for this wallet."""
+        if snapshot is not None and not client.offer(json.dumps({"type": "snapshot", "address": address, "status": snapshot})):
+            self._drop(client)
+            return
+        client.addresses.add(address)
+        self._subscribers.setdefault(address, set()).add(client)
+
+    def unsubscribe(self, client: StreamClient, addresses: Iterable[str]):
+        for address in addresses:
+            client.addresses.discard(address)
+            subscribers = self._subscribers.get(address)
+            if subscribers is not None:
+                subscribers.discard(client)
+                if not subscribers:
+                    del self._subscribers[address]
+
+    def has_subscribers(self, address: str) -> bool:
+        return address in self._subscribers
+
+    def followed(self) -> List[str]:
+        return list(self._subscribers)
+
+    def publish(self, address: str, event_type: str, **fields):
+        subscribers = self._subscribers.get(address)
+        if not subscribers:
+            return
+        message = json.dumps({"type": event_type, "address": address, **fields})
+        self.published += 1
+        for client in list(subscribers):
+            if not client.offer(message):
+                self._drop(client)
+
+    def _drop(self, client: StreamClient):
+        if client.dropped:
+            return
+        self.dropped += 1
+        self.unsubscribe(client, list(client.addresses))
+        client.end(json.dumps({"type": "dropped", "message": "Client too slow, reconnect to resume"}))
+
+    def stats(self) -> dict:
+        return {
+            "clients": len(self.clients),
+            "wallets": len(self._subscribers),
+            "published": self.published,
+            "dropped": self.dropped,
+        }
+
+
+status_stream = StatusBroadcaster()
+
+
+class StatusRelay:
+    """
+    Deltas are only published by the worker that owns a wallet. For the
+    followed wallets owned by other workers, this polls their stored
+    versions and sends a fresh snapshot to the local clients whenever one
+    moves, so they lag the owner by about one flush plus one interval.
+    """
+
+    def __init__(self, broadcaster: StatusBroadcaster, interval: Optional[float] = None):
+        self.broadcaster = broadcaster
+        self.interval = interval or STREAM_RELAY_INTERVAL
+        self._versions: Dict[str, int] = {}
+        self.relayed = 0
+
+    def seen(self, address: str, version: int):
+        """Version a client's snapshot was taken at, so only later changes are relayed."""
+        self._versions.setdefault(address, version)
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.poll()
+            except Exception as e:
+                print(f"Stream relay failed: {e}")
+
+    async def poll(self):
+        remote = [address for address in self.broadcaster.followed() if not cluster.owns(address)]
+        for address in set(self._versions).difference(remote):
+            del self._versions[address]
+        if not remote:
+            return
+        for address, version in (await state_store.versions(remote)).items():
+            if self._versions.get(address) == version:
+                continue
+            status = await state_store.load(address)
+            if status is None:
+                continue
+            self._versions[address] = status.version
+            self.relayed += 1
+            self.broadcaster.publish(address, "snapshot", status=status.to_status().model_dump())
+
+
+status_relay = StatusRelay(status_stream)
@@ -0,0 +1,233 @@
+import asyncio
+import json
+import os
+import itertools
+import time
+from typing import Callable, Dict, List, Optional, Union
+
+from .metrics import WS_CONNECTIONS, WS_DISPATCH_LAG, WS_PING_LATENCY, WS_RECONNECTS, WS_SUBSCRIPTIONS
+from .startup import lazy_import
+
+websockets = lazy_import("websockets")
+
+
+class Subscription:
+    """
+    A single RPC pubsub subscription (logsSubscribe, accountSubscribe, ...).
+    sub_id is the server-side id and is reset whenever the socket drops.
+    """
+    __slots__ = ("method", "params", "callback", "sub_id", "connection")
+
+    def __init__(self, method: str, params: list, callback: Callable[[dict], None]):
+        self.method = method
+        self.params = params
+        self.callback = callback
+        self.sub_id: Optional[int] = None
+        self.connection: Optional["_Connection"] = None
+
+    @property
+    def unsubscribe_method(self) -> str:
+        return self.method.replace("Subscribe", "Unsubscribe")
+
+
+class _Connection:
+    """One WebSocket carrying many subscriptions."""
+
+    def __init__(self, manager: "SubscriptionManager", index: int):
+        self.manager = manager
+        self.index = index
+        self.subscriptions: List[Subscription] = []
+        self.by_sub_id: Dict[int, Subscription] = {}
+        self.pending: Dict[int, Subscription] = {}
+        self.websocket = None
+        self.task: Optional[asyncio.Task] = None
+        self.failovers = 0
+
+    def start(self):
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        task, self.task = self.task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    async def _run(self):
+        while self.subscriptions:
+            # Spread connections over the endpoints and move to the next one after a failure
+            ws_url = self.manager.ws_urls[(self.index + self.failovers) % len(self.manager.ws_urls)]
+            try:
+                async with websockets.connect(ws_url) as websocket:
+                    self.websocket = websocket
+                    print(f"WS connection {self.index} up, subscribing {len(self.subscriptions)} wallets")
+
+                    # Re-subscribe everything in one go, responses are matched by request id
+                    for subscription in list(self.subscriptions):
+                        await self._send_subscribe(subscription)
+
+                    async for message in websocket:
+                        received = time.perf_counter()
+                        data = json.loads(message)
+                        self._dispatch(data)
+                        if "method" in data:
+                            WS_DISPATCH_LAG.observe(time.perf_counter() - received, method=data["method"])
+
+                print(f"WebSocket {self.index} closed by server")
+                WS_RECONNECTS.inc()
+            except asyncio.CancelledError:
+                raise
+            except Exception as conn_err:
+                WS_RECONNECTS.inc()
+                self.failovers += 1
+                print(f"WS connection {self.index} failed: {conn_err}. Retrying in {self.manager.reconnect_delay}s...")
+            finally:
+                self._reset()
+
+            if self.subscriptions:
+                await asyncio.sleep(self.manager.reconnect_delay)
+
+        print(f"WS connection {self.index} has no subscriptions left, closing")
+
+    def _reset(self):
+        self.websocket = None
+        self.by_sub_id.clear()
+        self.pending.clear()
+        for subscription in self.subscriptions:
+            subscription.sub_id = None
+
+    async def _send_subscribe(self, subscription: Subscription):
+        request_id = next(self.manager._request_ids)
+        self.pending[request_id] = subscription
+        await self.websocket.send(json.dumps({
+            "jsonrpc": "2.0",
+            "id": request_id,
+            "method": subscription.method,
+            "params": subscription.params,
+        }))
+
+    async def _send_unsubscribe(self, subscription: Subscription):
+        if self.websocket is None or subscription.sub_id is None:
+            return
+        self.by_sub_id.pop(subscription.sub_id, None)
+        try:
+            await self.websocket.send(json.dumps({
+                "jsonrpc": "2.0",
+                "id": next(self.manager._request_ids),
+                "method": subscription.unsubscribe_method,
+                "params": [subscription.sub_id],
+            }))
+        except Exception as e:
+            print(f"Error unsubscribing {subscription.sub_id}: {e}")
+        subscription.sub_id = None
+
+    def _dispatch(self, data: dict):
+        if "id" in data:
+            # Reply to a (un)subscribe request
+            subscription = self.pending.pop(data["id"], None)
+            if subscription is None:
+                return
+            if "error" in data:
+                print(f"{subscription.method} rejected: {data['error']}")
+                return
+            subscription.sub_id = data["result"]
+            if subscription in self.subscriptions:
+                self.by_sub_id[subscription.sub_id] = subscription
+            else:
+                # Unsubscribed while the request was in flight
+                asyncio.create_task(self._send_unsubscribe(subscription))
+            return
+
+        params = data.get("params")
+        if not params:
+            return
+        subscription = self.by_sub_id.get(params.get("subscription"))
+        if subscription is None:
+            return
+        try:
+            subscription.callback(data)
+        except Exception as e:
+            print(f"Error in {data.get('method')} handler: {e}")
+
+
+class SubscriptionManager:
+    """
+    Multiplexes pubsub subscriptions over a small pool of WebSocket connections.
+    Notifications are routed back to their callback by subscription id.
+    """
+
+    def __init__(self, ws_urls: Union[str, List[str]], max_connections: Optional[int] = None,
+                 subscriptions_per_connection: Optional[int] = None, reconnect_delay: float = 5):
+        self.ws_urls = [ws_urls] if isinstance(ws_urls, str) else list(ws_urls)
+        self.max_connections = max_connections or int(os.getenv("WS_POOL_SIZE", "4"))
+        self.subscriptions_per_connection = subscriptions_per_connection or int(os.getenv("WS_SUBSCRIPTIONS_PER_CONNECTION", "500"))
+        self.reconnect_delay = reconnect_delay
+        self.connections: List[_Connection] = []
+        self._request_ids = itertools.count(1)
+        WS_CONNECTIONS.set_function(lambda: sum(1 for c in self.connections if c.websocket is not None))
+        WS_SUBSCRIPTIONS.set_function(self._subscription_counts)
+        WS_PING_LATENCY.set_function(self._ping_latencies)
+
+    def _pick_connection(self) -> _Connection:
+        open_slots = [c for c in self.connections if len(c.subscriptions) < self.subscriptions_per_connection]
+        if open_slots:
+            return min(open_slots, key=lambda c: len(c.subscriptions))
+        if len(self.connections) < self.max_connections:
+            connection = _Connection(self, len(self.connections))
+            self.connections.append(connection)
+            return connection
+        print("WS pool is full, overloading least busy connection")
+        return min(self.connections, key=lambda c: len(c.subscriptions))
+
+    async def subscribe(self, method: str, params: list, callback: Callable[[dict], None]) -> Subscription:
+        subscription = Subscription(method, params, callback)
+        connection = self._pick_connection()
+        subscription.connection = connection
+        connection.subscriptions.append(subscription)
+
+        if connection.websocket is not None:
+            await connection._send_subscribe(subscription)
+        # Otherwise it is sent together with the rest once the socket is (re)connected
+        connection.start()
+        return subscription
+
+    async def unsubscribe(self, subscription: Subscription):
+        connection = subscription.connection
+        if connection is None or subscription not in connection.subscriptions:
+            return
+        connection.subscriptions.remove(subscription)
+        await connection._send_unsubscribe(subscription)
+        subscription.connection = None
+
+        if not connection.subscriptions:
+            await connection.stop()
+            connection._reset()
+
+    @property
+    def subscription_count(self) -> int:
+        return sum(len(c.subscriptions) for c in self.connections)
+
+    def _subscription_counts(self) -> Dict[tuple, int]:
+        """Subscriptions the server has acknowledged, per method."""
+        counts: Dict[tuple, int] = {}
+        for connection in self.connections:
+            for subscription in connection.by_sub_id.values():
+                key = (subscription.method,)
+                counts[key] = counts.get(key, 0) + 1
+        return counts
+
+    def _ping_latencies(self) -> Dict[tuple, float]:
+        # websockets measures this from its keepalive pings
+        return {
+            (str(c.index),): getattr(c.websocket, "latency", 0.0)
+            for c in self.connections if c.websocket is not None
+        }
+
+    async def close(self):
+        for connection in self.connections:
+            connection.subscriptions.clear()
+            await connection.stop()
+            connection._reset()
@@ -0,0 +1,152 @@
+import base64
+import os
+import struct
+from typing import Dict, Iterable, NamedTuple, Optional, Tuple
+
+from .cache import LRUCache
+from .rpc import solana_rpc
+from .startup import lazy_import
+
+pubkey_module = lazy_import("solders.pubkey")
+
+TOKEN_PROGRAM = "TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA"
+TOKEN_2022_PROGRAM = "TokenzQdBNbLqP5VEhdkAS6EPFLC1PHnBqCXEpPxuEb"
+TOKEN_PROGRAMS = (TOKEN_PROGRAM, TOKEN_2022_PROGRAM)
+# Symbols of legacy SPL mints live in a Metaplex metadata account
+METADATA_PROGRAM = "metaqbxxUerdq28cj1RbAWkYQm3ybzjb6a8bt518x1s"
+# key u8, update authority, mint, then the borsh name and symbol strings
+METADATA_NAME_OFFSET = 1 + 32 + 32
+_U32 = struct.Struct("<I")
+
+
+class MintInfo(NamedTuple):
+    mint: str
+    decimals: int
+    program: str
+    symbol: Optional[str] = None
+
+    def label(self) -> str:
+        if self.symbol:
+            return self.symbol
+        kind = "Token-2022" if self.program == TOKEN_2022_PROGRAM else "SPL Token"
+        return f"{kind} ({self.mint[:4]}...)"
+
+
+def token_balance_changes(meta) -> Tuple[Dict[Tuple[str, str], int], Dict[str, int]]:
+    """
+    Net change in base units per (owner, mint), from one pass over the pre
+    then post token balances, and the decimals of each mint seen. Several
+    token accounts of the same owner and mint are summed.
+    """
+    changes: Dict[Tuple[str, str], int] = {}
+    decimals: Dict[str, int] = {}
+    for sign, balances in ((-1, meta.pre_token_balances), (1, meta.post_token_balances)):
+        for item in balances or []:
+            if item.owner is None:
+                continue  # Recorded before owners were added to token balances
+            mint = str(item.mint)
+            key = (str(item.owner), mint)
+            changes[key] = changes.get(key, 0) + sign * int(item.ui_token_amount.amount)
+            decimals[mint] = item.ui_token_amount.decimals
+    return changes, decimals
+
+
+def _parse_mint(mint: str, account: Optional[dict]) -> Optional[MintInfo]:
+    """MintInfo from a jsonParsed mint account, None if it isn't one."""
+    if not account or account.get("owner") not in TOKEN_PROGRAMS or not isinstance(account.get("data"), dict):
+        return None
+    parsed = account["data"].get("parsed") or {}
+    if parsed.get("type") != "mint":
+        return None
+    info = parsed["info"]
+    symbol = None
+    # Token-2022 mints can carry their metadata in an extension
+    for extension in info.get("extensions") or []:
+        if extension.get("extension") == "tokenMetadata":
+            symbol = extension.get("state", {}).get("symbol") or None
+    return MintInfo(mint, info["decimals"], account["owner"], symbol)
+
+
+def _metadata_address(mint: str) -> str:
+    Pubkey = pubkey_module.Pubkey
+    program = Pubkey.from_string(METADATA_PROGRAM)
+    address, _ = Pubkey.find_program_address([b"metadata", bytes(program), bytes(Pubkey.from_string(mint))], program)
+    return str(address)
+
+
+def _metadata_symbol(account: Optional[dict]) -> Optional[str]:
+    """Symbol from a base64 Metaplex metadata account."""
+    if not account or account.get("owner") != METADATA_PROGRAM:
+        return None
+    try:
+        data = base64.b64decode(account["data"][0])
+        (name_len,) = _U32.unpack_from(data, METADATA_NAME_OFFSET)
+        symbol_offset = METADATA_NAME_OFFSET + 4 + name_len
+        (symbol_len,) = _U32.unpack_from(data, symbol_offset)
+        symbol = data[symbol_offset + 4:symbol_offset + 4 + symbol_len].rstrip(b"\0").decode(errors="replace")
+    except (struct.error, ValueError):
+        return None
+    return symbol.strip() or None
+
+
+class MintRegistry:
+    """
+    Decimals, owning token program and symbol per mint.
+
+    Unknown mints are fetched together: one getMultipleAccounts for the
+    mints themselves, and one more for the Metaplex metadata of those
+    without a Token-2022 metadata extension. Results stay in an LRU, since a
+    mint's decimals and program never change. Mints that can't be found are
+    not cached, so they are tried again next time.
+    """
+
+    def __init__(self, cache_size: Optional[int] = None):
+        self.cache = LRUCache(cache_size or int(os.getenv("MINT_CACHE_SIZE", "10000")))
+        self.fetched = 0
+        self.unknown = 0
+
+    def peek(self, mint: str) -> Optional[MintInfo]:
+        """Cached entry only, for callers that can't wait for a fetch."""
+        return self.cache.get(mint)
+
+    async def get_many(self, mints: Iterable[str]) -> Dict[str, MintInfo]:
+        found: Dict[str, MintInfo] = {}
+        missing = []
+        for mint in dict.fromkeys(mints):
+            info = self.cache.lookup(mint)
+            if info is None:
+                missing.append(mint)
+            else:
+                found[mint] = info
+        if not missing:
+            return found
+
+        fetched = []
+        for mint, account in zip(missing, await solana_rpc.get_multiple_accounts(missing, encoding="jsonParsed")):
+            info = _parse_mint(mint, account)
+            if info is None:
+                self.unknown += 1
+            else:
+                fetched.append(info)
+
+        unnamed = [i for i, info in enumerate(fetched) if info.symbol is None]
+        if unnamed:
+            try:
+                accounts = await solana_rpc.get_multiple_accounts([_metadata_address(fetched[i].mint) for i in unnamed])
+                for i, account in zip(unnamed, accounts):
+                    fetched[i] = fetched[i]._replace(symbol=_metadata_symbol(account))
+            except Exception as e:
+                # Decimals are what matters, symbols are cosmetic
+                print(f"Could not fetch token metadata: {e}")
+
+        for info in fetched:
+            self.fetched += 1
+            self.cache.put(info.mint, info)
+            found[info.mint] = info
+        return found
+
+    def stats(self) -> dict:
+        return {"fetched": self.fetched, "unknown": self.unknown, "cache": self.cache.stats()}
+
+
+mint_registry = MintRegistry()
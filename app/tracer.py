@@ -0,0 +1,184 @@
+import asyncio
+import os
+from typing import AsyncIterator, Awaitable, Callable, List, NamedTuple, Optional, Set
+
+from .cache import get_transaction
+from .lookup_tables import resolve_account_keys
+from .tokens import token_balance_changes
+from .risk import risk_db
+from .rpc import solana_rpc
+
+TRACE_CONCURRENCY = int(os.getenv("TRACE_CONCURRENCY", "8"))
+# getSignaturesForAddress pages walked back per wallet to reach the time funds arrived
+TRACE_MAX_PAGES = int(os.getenv("TRACE_MAX_PAGES", "10"))
+# Events the crawl may get ahead of a slow client before the workers wait
+TRACE_EVENT_BUFFER = int(os.getenv("TRACE_EVENT_BUFFER", "1000"))
+
+
+class Outflow(NamedTuple):
+    receiver: str
+    amount: float
+    token: str  # "SOL" or the mint address
+
+
+def find_outflows(tx, address: str, str_keys: List[str]) -> List[Outflow]:
+    """
+    Funds that left `address` in this transaction, attributed to every
+    account whose balance of the same asset went up. str_keys are the
+    transaction's resolved account keys.
+    """
+    outflows: List[Outflow] = []
+    meta = tx.value.transaction.meta
+
+    # SOL, from lamport balances
+    if address in str_keys:
+        idx = str_keys.index(address)
+        if meta.post_balances[idx] < meta.pre_balances[idx]:
+            for i, (pre, post) in enumerate(zip(meta.pre_balances, meta.post_balances)):
+                if i != idx and post > pre:
+                    outflows.append(Outflow(str_keys[i], (post - pre) / 1e9, "SOL"))
+
+    # SPL tokens, from owner balance changes per mint in base units
+    changes, decimals = token_balance_changes(meta)
+    sent_mints = {mint for (owner, mint), change in changes.items() if owner == address and change < 0}
+    for (owner, mint), change in changes.items():
+        if mint in sent_mints and owner != address and change > 0:
+            outflows.append(Outflow(owner, change / 10 ** decimals[mint], mint))
+    return outflows
+
+
+class FundFlowTracer:
+    """
+    Breadth-first crawl of outgoing SOL/SPL flows starting at one wallet.
+
+    Work items (list a wallet's signatures, inspect one transaction) go
+    through a queue drained by a fixed number of workers. Each hop only looks
+    at the first max_signatures transactions at or after the time the funds
+    arrived, paging back through the wallet's history to find them. Expansion stops
+    at labeled addresses, after max_hops, or once max_addresses wallets have
+    been visited. Events are yielded while the crawl is still running.
+    """
+
+    def __init__(self, root: str, max_hops: int = 5, min_sol: float = 0.01, min_token: float = 0.0,
+                 max_signatures: int = 50, max_addresses: int = 200, concurrency: int = TRACE_CONCURRENCY):
+        self.root = root
+        self.max_hops = max_hops
+        self.min_sol = min_sol
+        self.min_token = min_token
+        self.max_signatures = max_signatures
+        self.max_addresses = max_addresses
+        self.concurrency = concurrency
+
+        self.visited_addresses: Set[str] = set()
+        self.visited_signatures: Set[str] = set()
+        self.edge_count = 0
+        self._jobs: asyncio.Queue = asyncio.Queue()
+        self._events: asyncio.Queue = asyncio.Queue(maxsize=TRACE_EVENT_BUFFER)
+
+    def _submit(self, job: Callable[[], Awaitable[None]]):
+        self._jobs.put_nowait(job)
+
+    def _visit(self, address: str, hop: int, since: Optional[int]):
+        if address in self.visited_addresses or len(self.visited_addresses) >= self.max_addresses:
+            return
+        self.visited_addresses.add(address)
+        self._submit(lambda: self._expand(address, hop, since))
+
+    async def _history(self, address: str, since: Optional[int]) -> List[dict]:
+        """
+        Signature infos to inspect, newest first: the wallet's latest for the
+        root, otherwise the earliest max_signatures at or after `since`.
+        """
+        if since is None:
+            return await solana_rpc.get_signatures_for_address(address, limit=self.max_signatures)
+        infos: List[dict] = []
+        before = None
+        for _ in range(TRACE_MAX_PAGES):
+            page = await solana_rpc.get_signatures_for_address(address, limit=1000, before=before)
+            for info in page:
+                if info.get("blockTime") is not None and info["blockTime"] < since:
+                    return infos[-self.max_signatures:]
+                infos.append(info)
+            if len(page) < 1000:
+                return infos[-self.max_signatures:]
+            before = page[-1]["signature"]
+        # Too busy to reach the arrival: inspect the oldest ones we got
+        await self._events.put({
+            "type": "truncated",
+            "address": address,
+            "message": f"History after the funds arrived exceeds {TRACE_MAX_PAGES * 1000} signatures",
+        })
+        return infos[-self.max_signatures:]
+
+    async def _expand(self, address: str, hop: int, since: Optional[int]):
+        for info in await self._history(address, since):
+            signature = info["signature"]
+            if info.get("err") or signature in self.visited_signatures:
+                continue
+            self.visited_signatures.add(signature)
+            self._submit(lambda signature=signature: self._inspect(signature, address, hop))
+
+    async def _inspect(self, signature: str, address: str, hop: int):
+        tx = await get_transaction(signature)
+        if not tx.value or tx.value.transaction.meta.err:
+            return
+
+        for outflow in find_outflows(tx, address, await resolve_account_keys(tx)):
+            threshold = self.min_sol if outflow.token == "SOL" else self.min_token
+            if outflow.amount < threshold:
+                continue
+
+            labels = risk_db.lookup(outflow.receiver)
+            self.edge_count += 1
+            await self._events.put({
+                "type": "edge",
+                "hop": hop + 1,
+                "source": address,
+                "destination": outflow.receiver,
+                "amount": outflow.amount,
+                "token": outflow.token,
+                "signature": signature,
+                "block_time": tx.value.block_time,
+                "labels": [label._asdict() for label in labels],
+            })
+
+            if labels:
+                # Reached a known exchange/mixer/etc, no need to go further
+                continue
+            if hop + 1 < self.max_hops:
+                self._visit(outflow.receiver, hop + 1, tx.value.block_time)
+
+    async def _worker(self):
+        while True:
+            job = await self._jobs.get()
+            try:
+                await job()
+            except Exception as e:
+                await self._events.put({"type": "error", "message": str(e)})
+            finally:
+                self._jobs.task_done()
+
+    async def run(self) -> AsyncIterator[dict]:
+        self._visit(self.root, 0, None)
+        workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+        finished = asyncio.create_task(self._jobs.join())
+        try:
+            while True:
+                if self._events.empty() and finished.done():
+                    break
+                getter = asyncio.create_task(self._events.get())
+                await asyncio.wait({getter, finished}, return_when=asyncio.FIRST_COMPLETED)
+                if getter.done():
+                    yield getter.result()
+                else:
+                    getter.cancel()
+            yield {
+                "type": "done",
+                "addresses": len(self.visited_addresses),
+                "signatures": len(self.visited_signatures),
+                "edges": self.edge_count,
+            }
+        finally:
+            finished.cancel()
+            for worker in workers:
+                worker.cancel()
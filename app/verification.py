@@ -1,10 +1,14 @@
-from solana.rpc.api import Client
-from solders.signature import Signature
-import os
+import time
+from typing import AsyncIterator, Dict, List, Optional
+from .cache import get_transaction, get_transactions, transaction_cache
+from .lookup_tables import lookup_tables, resolve_account_keys
+from .models import VerificationRequest
+from .rpc import solana_rpc
+from .activity import signature_module
+from .tokens import mint_registry, token_balance_changes
 
-def get_solana_client():
-    rpc_url = os.getenv("SOLANA_RPC_URL", "https://api.mainnet-beta.solana.com")
-    return Client(rpc_url)
+# getSignatureStatuses accepts at most 256 signatures per call
+SIGNATURE_STATUS_LIMIT = 256
 
 def check_sol_transfer(meta, account_keys, sender: str, receiver: str) -> dict:
     """
@@ -20,16 +24,18 @@ def check_sol_transfer(meta, account_keys, sender: str, receiver: str) -> dict:
         pre_balances = meta.pre_balances
         post_balances = meta.post_balances
 
-        # Calculate changes (in SOL)
-        sender_change = (post_balances[sender_idx] - pre_balances[sender_idx]) / 1e9
-        receiver_change = (post_balances[receiver_idx] - pre_balances[receiver_idx]) / 1e9
+        # Calculate changes (in lamports)
+        sender_change = post_balances[sender_idx] - pre_balances[sender_idx]
+        receiver_change = post_balances[receiver_idx] - pre_balances[receiver_idx]
 
        
         
         if receiver_change > 0:
             return {
                 "verified": True,
-                "amount": receiver_change,
+                "amount": receiver_change / 1e9,
+                "raw_amount": str(receiver_change),
+                "decimals": 9,
                 "token": "SOL",
                 "message": "Verified SOL transfer"
             }
@@ -40,62 +46,37 @@ def check_sol_transfer(meta, account_keys, sender: str, receiver: str) -> dict:
     return {"verified": False}
 
 def check_token_transfer(meta, sender: str, receiver: str) -> dict:
-    
-    
-    pre_tokens = meta.pre_token_balances
-    post_tokens = meta.post_token_balances
-    
-    # Map (owner, mint) -> balance
-    def map_balances(token_list):
-        balances = {}
-        for item in token_list:
-            owner = item.owner
-            mint = item.mint
-            amount = float(item.ui_token_amount.ui_amount or 0)
-            balances[(owner, mint)] = amount
-        return balances
-
-    pre_map = map_balances(pre_tokens)
-    post_map = map_balances(post_tokens)
-    
-   
-    for item in post_tokens:
-        if item.owner == receiver:
-            mint = item.mint
-            new_bal = float(item.ui_token_amount.ui_amount or 0)
-            old_bal = pre_map.get((receiver, mint), 0.0)
-            
-            diff = new_bal - old_bal
-            
-            if diff > 0:
-                
-                return {
-                    "verified": True,
-                    "amount": diff,
-                    "token": f"SPL Token ({mint[:4]}...)",
-                    "mint": mint,
-                    "message": f"Verified SPL Token transfer"
-                }
+    """
+    Checks for SPL / Token-2022 transfers from the owners' token balance
+    changes, in exact base units.
+    """
+    changes, decimals = token_balance_changes(meta)
+    for (owner, mint), diff in changes.items():
+        if owner == receiver and diff > 0:
+            return {
+                "verified": True,
+                "amount": diff / 10 ** decimals[mint],
+                "raw_amount": str(diff),
+                "decimals": decimals[mint],
+                "token": f"SPL Token ({mint[:4]}...)",
+                "mint": mint,
+                "message": f"Verified SPL Token transfer"
+            }
 
     return {"verified": False}
 
-def verify_transaction(signature: str, sender: str, receiver: str) -> dict:
-    client = get_solana_client()
+def evaluate_transaction(tx, sender: str, receiver: str, str_keys: List[str]) -> dict:
+    """
+    Runs the SOL and SPL checks against an already fetched transaction.
+    str_keys are its resolved account keys, see resolve_account_keys.
+    """
     try:
-        sig = Signature.from_string(signature)
-        # Fetch transaction details
-        tx = client.get_transaction(sig, max_supported_transaction_version=0)
-        
         if not tx.value:
             return {"verified": False, "message": "Transaction not found"}
 
         meta = tx.value.transaction.meta
         if meta.err:
              return {"verified": False, "message": "Transaction failed on chain"}
-             
-        # Get Account Keys as strings
-        account_keys = tx.value.transaction.transaction.message.account_keys
-        str_keys = [str(k) for k in account_keys]
         
         # 1. Check SOL Transfer
         sol_result = check_sol_transfer(meta, str_keys, sender, receiver)
@@ -106,10 +87,93 @@ def verify_transaction(signature: str, sender: str, receiver: str) -> dict:
         # 2. Check SPL Token Transfer
         token_result = check_token_transfer(meta, sender, receiver)
         if token_result["verified"]:
-             token_result["timestamp"] = tx.value.block_t # Shortened mint addressime
+             token_result["timestamp"] = tx.value.block_time
              return token_result
 
         return {"verified": False, "message": "No significant SOL or Token movement found to the scammer address."}
 
     except Exception as e:
         return {"verified": False, "message": f"Error: {str(e)}"}
+
+async def verify_transaction(signature: str, sender: str, receiver: str,
+                             timings: Optional[Dict[str, float]] = None) -> dict:
+    """timings, when given, is filled with fetch_ms/resolve_ms/evaluate_ms for this call."""
+    started = time.perf_counter()
+    try:
+        # Fetch transaction details
+        tx = await get_transaction(signature)
+        fetched = time.perf_counter()
+        str_keys = await resolve_account_keys(tx)
+    except Exception as e:
+        return {"verified": False, "message": f"Error: {str(e)}"}
+    resolved = time.perf_counter()
+    result = evaluate_transaction(tx, sender, receiver, str_keys)
+    if timings is not None:
+        timings["fetch_ms"] = (fetched - started) * 1000
+        timings["resolve_ms"] = (resolved - fetched) * 1000
+        timings["evaluate_ms"] = (time.perf_counter() - resolved) * 1000
+    await _label_tokens([result])
+    return result
+
+async def _label_tokens(results: List[dict]):
+    """Names verified token transfers after their mint, one registry call for all of them."""
+    mints = [result["mint"] for result in results if result.get("mint")]
+    if not mints:
+        return
+    try:
+        known = await mint_registry.get_many(mints)
+    except Exception as e:
+        print(f"Could not load mint metadata: {e}")
+        return
+    for result in results:
+        info = known.get(result.get("mint"))
+        if info is not None:
+            result["token"] = info.label()
+
+async def _verify_chunk(requests: List[VerificationRequest]) -> List[dict]:
+    errors: Dict[str, str] = {}
+    valid = []
+    for signature in dict.fromkeys(r.transaction_signature for r in requests):
+        try:
+            signature_module.Signature.from_string(signature)
+            valid.append(signature)
+        except ValueError:
+            # One malformed signature would fail the whole status call
+            errors[signature] = "Error: Invalid transaction signature"
+
+    try:
+        # Cheap pass first so missing/failed txs never cost a full getTransaction
+        unknown = [sig for sig in valid if transaction_cache.get(sig) is None]
+        statuses = await solana_rpc.get_signature_statuses(unknown) if unknown else []
+        for signature, status in zip(unknown, statuses):
+            if status is None:
+                errors[signature] = "Transaction not found"
+            elif status.get("err"):
+                errors[signature] = "Transaction failed on chain"
+
+        txs = await get_transactions([sig for sig in valid if sig not in errors])
+        # Lookup tables missing from every meta are fetched in one go
+        keys = dict(zip(txs, await lookup_tables.account_keys(list(txs.values()))))
+    except Exception as e:
+        return [{"verified": False, "message": f"Error: {str(e)}"} for _ in requests]
+
+    results = []
+    for request in requests:
+        signature = request.transaction_signature
+        if signature in errors:
+            results.append({"verified": False, "message": errors[signature]})
+        else:
+            results.append(evaluate_transaction(txs[signature], request.user_wallet, request.scammer_wallet,
+                                                keys[signature]))
+    await _label_tokens(results)
+    return results
+
+async def verify_batch(requests: List[VerificationRequest]) -> AsyncIterator[dict]:
+    """
+    Verifies many transfers, yielding results in request order.
+    Works through SIGNATURE_STATUS_LIMIT requests at a time so callers can
+    stream results while the rest of the batch is still being fetched.
+    """
+    for start in range(0, len(requests), SIGNATURE_STATUS_LIMIT):
+        for result in await _verify_chunk(requests[start:start + SIGNATURE_STATUS_LIMIT]):
+            yield result
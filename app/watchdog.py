@@ -1,62 +1,134 @@
 import asyncio
-import websockets
-import json
-from solders.pubkey import Pubkey
-from solders.signature import Signature
-from solana.rpc.api import Client
-from solana.rpc.types import TokenAccountOpts
 import os
+import time
 import traceback
-from typing import Optional, List
+from typing import Optional, List, Dict, Set
 
-from .models import ScammerStatus, TokenInfo, AccountInfo
-from .state import scammer_db
+from .models import TokenInfo, AccountInfo
+from .activity import AlertRecord
+from .alerts import alert_dispatcher
+from .state import scammer_db, state_store, cluster, get_status, mark_dirty
 
 from .forensics import get_risk_label
+from .rpc import solana_rpc, endpoint_urls
+from .cache import get_transaction, get_transactions, TRANSACTION_BATCH_SIZE
+from .lookup_tables import resolve_account_keys
+from .subscriptions import SubscriptionManager, Subscription
+from .metrics import NOTIFICATION_TO_ANALYSIS, PENDING_TASKS, WALLET_TIERS
+from .streaming import status_stream
+from .firehose import Firehose
+from .tokens import TOKEN_PROGRAM, TOKEN_2022_PROGRAM, TOKEN_PROGRAMS, mint_registry
 
-async def trigger_whatsapp_alert(message: str):
-    print(f"[WhatsApp Alert]: {message}")
-    # In a real app, you would make a POST request to the WhatsApp API here
+# Wait before fetching a notified transaction so every RPC node has it
+ANALYSIS_DELAY = float(os.getenv("ANALYSIS_DELAY", "2"))
+
+# Seconds between reconciliation fetches of one wallet; push updates cover the gap
+RECONCILE_INTERVAL = float(os.getenv("ACCOUNT_RECONCILE_INTERVAL", "60"))
+
+# History analyzed when a wallet starts being monitored; 0 disables backfill
+BACKFILL_MAX_SIGNATURES = int(os.getenv("BACKFILL_MAX_SIGNATURES", "1000"))
+# Wallets backfilling at the same time
+_backfill_slots = asyncio.Semaphore(int(os.getenv("BACKFILL_CONCURRENCY", "4")))
+
+# Tiering: wallets quiet for COLD_AFTER seconds drop from live subscriptions
+# to polling, at most LIVE_WALLET_LIMIT wallets are live at once
+LIVE_WALLET_LIMIT = int(os.getenv("LIVE_WALLET_LIMIT", "1000"))
+COLD_AFTER = float(os.getenv("COLD_AFTER", "3600"))
+POLL_MIN_INTERVAL = float(os.getenv("POLL_MIN_INTERVAL", "30"))
+POLL_MAX_INTERVAL = float(os.getenv("POLL_MAX_INTERVAL", "900"))
+SCHEDULER_INTERVAL = float(os.getenv("SCHEDULER_INTERVAL", "5"))
+# History caught up on when a cold wallet is promoted, one getSignaturesForAddress page
+# at most, and never more than a first backfill would take
+PROMOTION_CATCHUP = min(1000, BACKFILL_MAX_SIGNATURES)
+
+# "subscriptions": per-wallet logs/account/token subscriptions.
+# "firehose": one blockSubscribe stream filtered against the monitored set.
+INGEST_MODE = os.getenv("INGEST_MODE", "subscriptions")
+
+def _parse_token_account(parsed: dict, program: str) -> Optional[TokenInfo]:
+    """TokenInfo from a jsonParsed token account, None for empty accounts."""
+    info = parsed['info']
+    # Base units are exact; uiAmount is a float and null for some mints
+    raw = int(info['tokenAmount']['amount'])
+    if raw <= 0: # Only store non-zero balances
+        return None
+    decimals = info['tokenAmount']['decimals']
+    known = mint_registry.peek(info['mint'])
+    return TokenInfo(
+        mint=info['mint'],
+        amount=raw / 10 ** decimals,
+        decimals=decimals,
+        raw_amount=str(raw),
+        program="spl-token-2022" if program == TOKEN_2022_PROGRAM else "spl-token",
+        symbol=known.symbol if known else None,
+    )
 
 class Watchdog:
     def __init__(self):
         self.active_monitors = set()
-        self.ws_url = "wss://api.mainnet-beta.solana.com"
-        self.rpc_client = Client("https://api.mainnet-beta.solana.com")
-        self.token_program_id = Pubkey.from_string("TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA")
+        self.ws_urls = endpoint_urls("SOLANA_WS_URLS", "SOLANA_WS_URL", "wss://api.mainnet-beta.solana.com")
+        self.subscriptions = SubscriptionManager(self.ws_urls)
+        self.firehose = Firehose(self.ws_urls, self._handle_firehose_match, self._handle_firehose_gap) if INGEST_MODE == "firehose" else None
+        self.wallet_subscriptions: Dict[str, List[Subscription]] = {}
+        self.rpc_client = solana_rpc
+
+        # Account state kept current by accountSubscribe/programSubscribe pushes
+        self.lamports: Dict[str, int] = {}
+        self.token_accounts: Dict[str, Dict[str, TokenInfo]] = {}
+        self._last_reconcile: Dict[str, float] = {}
+        self._reconcile_tasks: Dict[str, asyncio.Task] = {}
+        self._analysis_tasks: set = set()
+        self._backfills: Dict[str, asyncio.Task] = {}
+        # Signatures handled so far, per wallet, while its backfill runs
+        self._seen_signatures: Dict[str, set] = {}
+
+        # Tier scheduling
+        self.tiers: Dict[str, str] = {}
+        self._last_activity: Dict[str, float] = {}
+        self._poll_interval: Dict[str, float] = {}
+        self._next_poll: Dict[str, float] = {}
+        WALLET_TIERS.set_function(lambda: {
+            (tier,): sum(1 for t in self.tiers.values() if t == tier) for tier in ("hot", "cold")
+        })
+        PENDING_TASKS.set_function(lambda: {
+            ("analysis",): len(self._analysis_tasks),
+            ("reconcile",): len(self._reconcile_tasks),
+            ("backfill",): len(self._backfills),
+        })
+
+    async def _fetch_account_state(self, address: str):
+        # SOL balance, then token accounts (parsed) of both token programs, keyed by token account
+        balance_resp, *token_resps = await asyncio.gather(
+            self.rpc_client.get_balance(address),
+            *(self.rpc_client.get_token_accounts_by_owner(address, program) for program in TOKEN_PROGRAMS),
+        )
+        
+        token_accounts: Dict[str, TokenInfo] = {}
+        for program, resp in zip(TOKEN_PROGRAMS, token_resps):
+            for item in resp.value or []:
+                try:
+                    token = _parse_token_account(item.account.data.parsed, program)
+                    if token:
+                        token_accounts[str(item.pubkey)] = token
+                except Exception as parse_err:
+                    print(f"Error parsing token account: {parse_err}")
+                    continue
+
+        if token_accounts:
+            try:
+                mints = await mint_registry.get_many(token.mint for token in token_accounts.values())
+                for token in token_accounts.values():
+                    if token.mint in mints:
+                        token.symbol = mints[token.mint].symbol
+            except Exception as e:
+                print(f"Could not load mint metadata for {address}: {e}")
+        
+        return balance_resp.value, token_accounts
 
-    def get_account_details(self, address: str) -> AccountInfo:
+    async def get_account_details(self, address: str) -> AccountInfo:
         try:
-            pubkey = Pubkey.from_string(address)
-            
-            # 1. Get SOL Balance
-            balance_resp = self.rpc_client.get_balance(pubkey)
-            sol_balance = balance_resp.value / 1e9
-            
-            # 2. Get Token Accounts (Parsed)
-            # encoding='jsonParsed' is supported by standard RPC, checking python wrapper support
-            # logic: we try to fetch and parse manually if needed, but jsonParsed is best.
-            opts = TokenAccountOpts(program_id=self.token_program_id, encoding="jsonParsed")
-            resp = self.rpc_client.get_token_accounts_by_owner(pubkey, opts)
-            
-            tokens: List[TokenInfo] = []
-            if resp.value:
-                for item in resp.value:
-                    try:
-                        # item.account.data is parsed if encoding='jsonParsed'
-                        data = item.account.data.parsed
-                        info = data['info']
-                        mint = info['mint']
-                        amount = float(info['tokenAmount']['uiAmount'] or 0)
-                        decimals = info['tokenAmount']['decimals']
-                        
-                        if amount > 0: # Only store non-zero balances
-                            tokens.append(TokenInfo(mint=mint, amount=amount, decimals=decimals))
-                    except Exception as parse_err:
-                        print(f"Error parsing token account: {parse_err}")
-                        continue
-            
-            return AccountInfo(sol_balance=sol_balance, tokens=tokens)
+            lamports, token_accounts = await self._fetch_account_state(address)
+            return AccountInfo(sol_balance=lamports / 1e9, tokens=list(token_accounts.values()))
 
         except Exception as e:
             print(f"Error fetching account details for {address}: {e}")
@@ -66,112 +138,498 @@ class Watchdog:
         if address in self.active_monitors:
             print(f"Already monitoring {address}")
             return
+
+        if not cluster.owns(address):
+            # The owning worker starts it on its next rebalance
+            state_store.set_active(address, True)
+            print(f"{address} belongs to worker {cluster.owner(address)}, handing off")
+            return
         
         self.active_monitors.add(address)
+        state_store.set_active(address, True)
         print(f"Started monitoring {address}")
         
         # Immediate fetch of initial state
-        self._update_db_info(address)
+        await self._update_db_info(address)
+
+        self._last_activity[address] = time.monotonic()
+        status = scammer_db.get(address)
+        if status is not None and status.tier == "cold" and self.firehose is None:
+            # Restored as cold; the first poll catches up on anything missed
+            await self._go_cold(address)
+        else:
+            await self._go_live(address, BACKFILL_MAX_SIGNATURES)
+
+    async def _go_live(self, address: str, history_limit: int):
+        """Moves a wallet to live subscriptions, catching up on up to history_limit signatures."""
+        if address in self.wallet_subscriptions:
+            return
+        if self.firehose is not None:
+            # Matched against the block stream; nothing to subscribe or cap
+            self.wallet_subscriptions[address] = []
+            self._set_tier(address, "hot")
+            self.firehose.add(address)
+        else:
+            await self._make_room()
+            self._set_tier(address, "hot")
+            await self._subscribe(address)
 
-        while address in self.active_monitors:
+        # Subscribed first, so nothing falls between the backfill and live notifications
+        if history_limit > 0 and address not in self._backfills:
+            self._seen_signatures[address] = set()
+            self._backfills[address] = asyncio.create_task(self.backfill(address, history_limit))
+
+    async def _subscribe(self, address: str):
+        subscriptions = self.wallet_subscriptions[address] = []
+
+        # All wallets share the pooled sockets of the subscription manager.
+        # Balances arrive as pushes, logs only drive transaction analysis.
+        subscriptions.append(await self.subscriptions.subscribe(
+            "logsSubscribe",
+            [{"mentions": [address]}, {"commitment": "confirmed"}],
+            lambda data: self._handle_notification(address, data),
+        ))
+        subscriptions.append(await self.subscriptions.subscribe(
+            "accountSubscribe",
+            [address, {"encoding": "jsonParsed", "commitment": "confirmed"}],
+            lambda data: self._handle_account_notification(address, data),
+        ))
+        # Token accounts have the owner at offset 32 in both programs. Legacy ones
+        # are always 165 bytes, Token-2022 ones grow with their extensions.
+        owner_filter = {"memcmp": {"offset": 32, "bytes": address}}
+        for program, filters in ((TOKEN_PROGRAM, [{"dataSize": 165}, owner_filter]),
+                                 (TOKEN_2022_PROGRAM, [owner_filter])):
+            subscriptions.append(await self.subscriptions.subscribe(
+                "programSubscribe",
+                [program, {"encoding": "jsonParsed", "commitment": "confirmed", "filters": filters}],
+                lambda data, program=program: self._handle_token_notification(address, program, data),
+            ))
+
+    async def _go_cold(self, address: str):
+        """Drops a wallet's live subscriptions and hands it to the poller."""
+        self._set_tier(address, "cold")
+        for subscription in self.wallet_subscriptions.pop(address, []):
+            await self.subscriptions.unsubscribe(subscription)
+        status = scammer_db.get(address)
+        if status is not None and address not in self._backfills:
+            # The cursor only follows backfills; move it past what arrived live
+            if len(status.signatures):
+                cursor = status.signatures.last()
+            else:
+                # Polling without a cursor would take any old signature for new activity
+                cursor = status.backfill_cursor or await self._newest_signature(address)
+            if cursor is not None and cursor != status.backfill_cursor:
+                status.backfill_cursor = cursor
+                mark_dirty(address)
+        self._poll_interval[address] = POLL_MIN_INTERVAL
+        self._next_poll[address] = time.monotonic() + POLL_MIN_INTERVAL
+
+    async def _newest_signature(self, address: str) -> Optional[str]:
+        try:
+            infos = await self.rpc_client.get_signatures_for_address(address, limit=1)
+        except Exception as e:
+            print(f"Could not fetch the newest signature of {address}: {e}")
+            return None
+        return infos[0]["signature"] if infos else None
+
+    async def _make_room(self):
+        """Demotes the least recently active live wallets until one more fits."""
+        live = [a for a, tier in self.tiers.items() if tier == "hot"]
+        live.sort(key=lambda a: self._last_activity.get(a, 0.0))
+        while len(live) >= LIVE_WALLET_LIMIT and live:
+            await self._go_cold(live.pop(0))
+
+    def _set_tier(self, address: str, tier: str):
+        if self.tiers.get(address) != tier:
+            print(f"{address} is now {tier}")
+            status_stream.publish(address, "tier", tier=tier)
+        self.tiers[address] = tier
+        status = scammer_db.get(address)
+        if status is not None and status.tier != tier:
+            status.tier = tier
+            mark_dirty(address)
+
+    async def run_scheduler(self):
+        """Demotes idle wallets and polls cold ones, every SCHEDULER_INTERVAL."""
+        while True:
+            await asyncio.sleep(SCHEDULER_INTERVAL)
             try:
-                async with websockets.connect(self.ws_url) as websocket:
-                    print(f"Connected to WS for {address}")
-                    
-                    subscription_request = {
-                        "jsonrpc": "2.0",
-                        "id": 1,
-                        "method": "logsSubscribe",
-                        "params": [
-                            {"mentions": [address]},
-                            {"commitment": "confirmed"}
-                        ]
-                    }
-                    await websocket.send(json.dumps(subscription_request))
-                    
-                    while address in self.active_monitors:
-                        try:
-                            response = await websocket.recv()
-                            data = json.loads(response)
-                            
-                            if "method" in data and data["method"] == "logsNotification":
-                                self._handle_notification(address, data)
-                                
-                        except websockets.ConnectionClosed:
-                            print(f"WebSocket closed for {address}")
-                            break
-                        except Exception as e:
-                            print(f"Error receiving data for {address}: {e}")
-                            break
-            
-            except Exception as conn_err:
-                print(f"Connection failed for {address}: {conn_err}. Retrying in 5s...")
-                await asyncio.sleep(5)
-        
-        print(f"Stopped monitoring loop for {address}")
+                await self._schedule_tiers()
+            except Exception as e:
+                print(f"Tier scheduling failed: {e}")
+
+    async def _schedule_tiers(self):
+        if self.firehose is not None:
+            # Firehose wallets cost nothing to keep live
+            return
+        now = time.monotonic()
+        for address, tier in list(self.tiers.items()):
+            if tier == "hot" and now - self._last_activity.get(address, now) > COLD_AFTER:
+                await self._go_cold(address)
+
+        due = [a for a, tier in self.tiers.items() if tier == "cold" and self._next_poll.get(a, 0.0) <= now]
+        for start in range(0, len(due), TRANSACTION_BATCH_SIZE):
+            await self._poll(due[start:start + TRANSACTION_BATCH_SIZE])
+
+    async def _poll(self, addresses: List[str]):
+        """
+        One batched getSignaturesForAddress(limit=1, until=cursor) for many
+        cold wallets. Any result means new activity and promotes the wallet;
+        otherwise its interval doubles up to POLL_MAX_INTERVAL.
+        """
+        calls = []
+        for address in addresses:
+            config = {"limit": 1, "commitment": "confirmed"}
+            status = scammer_db.get(address)
+            if status is not None and status.backfill_cursor:
+                config["until"] = status.backfill_cursor
+            calls.append(("getSignaturesForAddress", [address, config]))
+        bodies = await self.rpc_client.batch(calls)
+
+        now = time.monotonic()
+        for address, body in zip(addresses, bodies):
+            if self.tiers.get(address) != "cold":
+                continue  # promoted or stopped meanwhile
+            if "error" in body:
+                print(f"Polling {address} failed: {body['error']}")
+            elif body.get("result"):
+                print(f"Activity on cold wallet {address}, going live")
+                self._last_activity[address] = now
+                await self._go_live(address, PROMOTION_CATCHUP)
+                self._schedule_reconcile(address)
+                continue
+            interval = min(POLL_MAX_INTERVAL, self._poll_interval.get(address, POLL_MIN_INTERVAL) * 2)
+            self._poll_interval[address] = interval
+            self._next_poll[address] = now + interval
+
+    def tier_info(self) -> dict:
+        now = time.monotonic()
+        wallets = {}
+        for address, tier in self.tiers.items():
+            info = {"tier": tier, "idle_seconds": round(now - self._last_activity.get(address, now), 1)}
+            if tier == "cold":
+                info["poll_interval"] = self._poll_interval.get(address)
+                info["next_poll_in"] = round(max(0.0, self._next_poll.get(address, now) - now), 1)
+            wallets[address] = info
+        return {
+            "live_limit": LIVE_WALLET_LIMIT,
+            "hot": sum(1 for t in self.tiers.values() if t == "hot"),
+            "cold": sum(1 for t in self.tiers.values() if t == "cold"),
+            "wallets": wallets,
+        }
+
+    async def backfill(self, address: str, limit: int = BACKFILL_MAX_SIGNATURES):
+        """
+        Runs the wallet's history since the last backfill (or its newest
+        `limit` transactions the first time) through the live analysis path,
+        oldest first. The cursor advances after each batch, so an interrupted
+        backfill resumes where it stopped, and with every live signature
+        while no backfill runs.
+        """
+        seen = self._seen_signatures.setdefault(address, set())
+        analyzed = 0
+        try:
+            status = scammer_db.get(address)
+            if status is None:
+                return
+            # Live notifications from an earlier run are already in the activity ring
+            seen.update(status.signatures)
+            # Held for the whole run, history paging included, so a burst of
+            # backfills (restore, firehose reconnect) can't flood the RPC
+            async with _backfill_slots:
+                infos = await self._fetch_history(address, status.backfill_cursor, limit)
+                for start in range(0, len(infos), TRANSACTION_BATCH_SIZE):
+                    chunk = infos[start:start + TRANSACTION_BATCH_SIZE]
+                    signatures = [info["signature"] for info in chunk
+                                  if not info.get("err") and info["signature"] not in seen]
+                    seen.update(signatures)
+                    if signatures:
+                        # One batched fetch; the analysis below then hits the cache
+                        await get_transactions(signatures)
+                    for signature in signatures:
+                        status.signatures.append(signature)
+                        status_stream.publish(address, "signature", signature=signature)
+                        await self._analyze_transaction(address, signature, delay=0)
+                    analyzed += len(signatures)
+                    status.backfill_cursor = chunk[-1]["signature"]
+                    mark_dirty(address)
+            # Live signatures handled meanwhile are newer than the fetched history
+            newest = status.signatures.last()
+            if newest is not None and newest != status.backfill_cursor:
+                status.backfill_cursor = newest
+                mark_dirty(address)
+            if infos:
+                print(f"Backfilled {analyzed} transactions for {address}")
+        except Exception as e:
+            print(f"Backfill of {address} failed: {e}")
+        finally:
+            # Unless a restarted monitor already replaced this run
+            if self._backfills.get(address) is asyncio.current_task():
+                del self._backfills[address]
+                self._seen_signatures.pop(address, None)
+
+    async def _fetch_history(self, address: str, until: Optional[str], max_signatures: int) -> List[dict]:
+        """Signature infos newer than `until`, oldest first, at most max_signatures."""
+        infos: List[dict] = []
+        before = None
+        while len(infos) < max_signatures:
+            limit = min(1000, max_signatures - len(infos))
+            page = await self.rpc_client.get_signatures_for_address(address, limit=limit, before=before, until=until)
+            infos.extend(page)
+            if len(page) < limit:
+                break
+            before = page[-1]["signature"]
+        infos.reverse()
+        return infos
+
+    async def restore_monitors(self):
+        """Resumes every wallet that was still being monitored at shutdown."""
+        started = await self.rebalance()
+        print(f"Restored {started} monitors")
+
+    async def rebalance(self) -> int:
+        """
+        Hands off wallets that now belong to another worker and starts the
+        active ones this worker owns but isn't monitoring yet.
+        """
+        for address in [a for a in self.active_monitors if not cluster.owns(a)]:
+            await self.release(address)
 
-    def stop_monitoring(self, address: str):
+        started = 0
+        for address in await state_store.active_addresses():
+            if address in self.active_monitors or not cluster.owns(address):
+                continue
+            if await get_status(address) is not None:
+                asyncio.create_task(self.start_monitoring(address))
+                started += 1
+        return started
+
+    async def release(self, address: str):
+        """Stops watching a wallet that moved to another worker, leaving it active in the store."""
+        self.active_monitors.discard(address)
+        print(f"Handing {address} off to worker {cluster.owner(address)}")
+        await self._teardown(address)
+        # Let the new owner load our latest state, then drop our copy
+        await state_store.flush()
+        scammer_db.pop(address, None)
+
+    async def stop_monitoring(self, address: str):
         if address in self.active_monitors:
             self.active_monitors.remove(address)
+            state_store.set_active(address, False)
             print(f"Stopping monitoring for {address}")
+        await self._teardown(address)
+
+    async def _teardown(self, address: str):
+        for subscription in self.wallet_subscriptions.pop(address, []):
+            await self.subscriptions.unsubscribe(subscription)
 
-    def _update_db_info(self, address: str):
+        for tasks in (self._reconcile_tasks, self._backfills):
+            task = tasks.pop(address, None)
+            if task is not None:
+                task.cancel()
+        self._seen_signatures.pop(address, None)
+        if self.firehose is not None:
+            self.firehose.remove(address)
+        for tier_state in (self.tiers, self._last_activity, self._poll_interval, self._next_poll):
+            tier_state.pop(address, None)
+        self.lamports.pop(address, None)
+        self.token_accounts.pop(address, None)
+        self._last_reconcile.pop(address, None)
+
+    async def _update_db_info(self, address: str):
         """Helper to fetch and update account info in DB"""
         if address in scammer_db:
-            info = self.get_account_details(address)
-            scammer_db[address].account_info = info
-            scammer_db[address].balance = info.sol_balance
-            print(f"Updated info for {address}: {info.sol_balance} SOL, {len(info.tokens)} tokens")
+            self._last_reconcile[address] = time.monotonic()
+            try:
+                lamports, token_accounts = await self._fetch_account_state(address)
+            except Exception as e:
+                print(f"Error fetching account details for {address}: {e}")
+                return
+            self.lamports[address] = lamports
+            self.token_accounts[address] = token_accounts
+            self._publish_account_info(address)
+            print(f"Updated info for {address}: {lamports / 1e9} SOL, {len(token_accounts)} tokens")
+
+    def _schedule_reconcile(self, address: str):
+        """
+        Debounced _update_db_info: a burst of activity results in at most one
+        fetch per RECONCILE_INTERVAL, run at the end of the window.
+        """
+        if address in self._reconcile_tasks:
+            return
+        due = self._last_reconcile.get(address, 0.0) + RECONCILE_INTERVAL
+        delay = max(0.0, due - time.monotonic())
+        self._reconcile_tasks[address] = asyncio.create_task(self._delayed_reconcile(address, delay))
+
+    async def _delayed_reconcile(self, address: str, delay: float):
+        try:
+            await asyncio.sleep(delay)
+            await self._update_db_info(address)
+        finally:
+            self._reconcile_tasks.pop(address, None)
+
+    def _publish_account_info(self, address: str):
+        if address in scammer_db:
+            sol_balance = self.lamports.get(address, 0) / 1e9
+            tokens = list(self.token_accounts.get(address, {}).values())
+            account_info = AccountInfo(sol_balance=sol_balance, tokens=tokens)
+            status = scammer_db[address]
+            if account_info == status.account_info:
+                return  # Same state pushed or reconciled again; keep the version and ETag
+            status_stream.publish(address, "balance", balance=sol_balance,
+                                  tokens=[token.model_dump() for token in tokens])
+            status.account_info = account_info
+            status.balance = sol_balance
+            mark_dirty(address)
+
+    def _handle_account_notification(self, address: str, data: dict):
+        self._last_activity[address] = time.monotonic()
+        value = data["params"]["result"]["value"]
+        self.lamports[address] = value["lamports"]
+        self._publish_account_info(address)
+
+    def _handle_token_notification(self, address: str, program: str, data: dict):
+        value = data["params"]["result"]["value"]
+        account_data = value["account"]["data"]
+        if not isinstance(account_data, dict):
+            # Not parseable as a token account, leave it to reconciliation
+            self._schedule_reconcile(address)
+            return
+        accounts = self.token_accounts.setdefault(address, {})
+        token = _parse_token_account(account_data["parsed"], program)
+        if token:
+            accounts[value["pubkey"]] = token
+        else:
+            accounts.pop(value["pubkey"], None)
+        self._publish_account_info(address)
+
+    def _record_signature(self, address: str, signature: str) -> bool:
+        """Adds a signature to the wallet's activity; False if it was already handled."""
+        print(f"Activity detected on {address}! Signature: {signature}")
+        self._last_activity[address] = time.monotonic()
+
+        seen = self._seen_signatures.get(address)
+        if seen is not None:
+            # Backfill in progress; whichever side sees a signature first handles it
+            if signature in seen:
+                return False
+            seen.add(signature)
+
+        # Update activity log
+        status = scammer_db.get(address)
+        if status is not None:
+            # Ring buffer, oldest signature is overwritten once full
+            status.signatures.append(signature)
+            if seen is None:
+                # Signatures arrive in order, so the next backfill only fetches what came after
+                status.backfill_cursor = signature
+            mark_dirty(address)
+            status_stream.publish(address, "signature", signature=signature)
+        return True
+
+    def _track(self, coro):
+        task = asyncio.create_task(coro)
+        self._analysis_tasks.add(task)
+        task.add_done_callback(self._analysis_tasks.discard)
 
     def _handle_notification(self, address: str, data: dict):
+        received = time.perf_counter()
         try:
             logs = data["params"]["result"]["value"]["logs"]
             signature = data["params"]["result"]["value"]["signature"]
-            
-            print(f"Activity detected on {address}! Signature: {signature}")
-            
-            # Update activity log
-            if address in scammer_db:
-                scammer_db[address].latest_activity.append(signature)
-                # Keep only last 50
-                if len(scammer_db[address].latest_activity) > 50:
-                    scammer_db[address].latest_activity.pop(0)
+            if not self._record_signature(address, signature):
+                return
 
-            # Re-fetch account info (Balance/Tokens) changed!
-            self._update_db_info(address)
+            # Balances/tokens are pushed; only queue a debounced consistency check
+            self._schedule_reconcile(address)
 
             # Analyze Transaction asynchronously to avoid blocking loop? 
             # Ideally yes, but here we do it inline or create a task.
             # Creating a task is safer for the WS loop.
-            asyncio.create_task(self._analyze_transaction(address, signature))
+            self._track(self._analyze_transaction(address, signature, received))
 
         except Exception as e:
             print(f"Error handling notification: {e}")
             traceback.print_exc()
 
-    async def _analyze_transaction(self, monitored_address: str, signature: str):
+    def _handle_firehose_match(self, address: str, signature: str, keys: List[str], meta: dict,
+                               block_time: Optional[int], received: float):
+        """A block transaction touching a monitored wallet, already decoded."""
+        try:
+            if not self._record_signature(address, signature):
+                return
+            # No account pushes in this mode: take the SOL balance from the
+            # transaction and leave token accounts to reconciliation
+            self.lamports[address] = meta["postBalances"][keys.index(address)]
+            self._publish_account_info(address)
+            self._schedule_reconcile(address)
+            self._track(self._analyze_parsed(
+                address, signature, keys, meta["preBalances"], meta["postBalances"],
+                meta.get("err") is not None, block_time, received,
+            ))
+        except Exception as e:
+            print(f"Error handling firehose match: {e}")
+
+    def _handle_firehose_gap(self, addresses: Set[str]):
+        """
+        The firehose missed blocks that may touch these wallets: backfill each
+        from its newest signature seen before the gap, which still comes
+        before anything the missed blocks held.
+        """
+        if PROMOTION_CATCHUP <= 0:
+            return  # Backfill is disabled
+        for address in addresses:
+            status = scammer_db.get(address)
+            if address not in self.active_monitors or status is None:
+                continue
+            running = self._backfills.pop(address, None)
+            if running is not None:
+                # Its cursor is still behind the gap; restart it so its fetch covers the gap too
+                running.cancel()
+            elif len(status.signatures):
+                status.backfill_cursor = status.signatures.last()
+                mark_dirty(address)
+            self._seen_signatures.setdefault(address, set())
+            self._backfills[address] = asyncio.create_task(self.backfill(address, PROMOTION_CATCHUP))
+
+    async def _analyze_transaction(self, monitored_address: str, signature: str, received: Optional[float] = None,
+                                   delay: Optional[float] = None):
+        """Fetches a notified transaction, then runs _analyze_parsed on it."""
         try:
             # Allow propagation
-            await asyncio.sleep(2) 
+            delay = ANALYSIS_DELAY if delay is None else delay
+            if delay > 0:
+                await asyncio.sleep(delay)
             
-            sig_obj = Signature.from_string(signature)
-            tx = self.rpc_client.get_transaction(sig_obj, max_supported_transaction_version=0)
+            tx = await get_transaction(signature)
             
             if not tx.value:
                 return
 
+            meta = tx.value.transaction.meta
+            await self._analyze_parsed(
+                monitored_address, signature, await resolve_account_keys(tx),
+                meta.pre_balances, meta.post_balances, meta.err is not None, tx.value.block_time, received,
+            )
+        except Exception as e:
+            print(f"Error analyzing tx {signature}: {e}")
+
+    async def _analyze_parsed(self, monitored_address: str, signature: str, str_keys: List[str],
+                              pre_balances: List[int], post_balances: List[int], failed: bool,
+                              block_time: Optional[int], received: Optional[float] = None):
+        """
+        Looks for SOL leaving the monitored wallet in an already decoded
+        transaction, from getTransaction or straight from the firehose.
+        """
+        try:
+            if received is not None:
+                NOTIFICATION_TO_ANALYSIS.observe(time.perf_counter() - received)
+
             # Reuse logic from verification.py or custom logic here
             # For now, let's look for SOL transfers OUT of the monitored address
-            
-            meta = tx.value.transaction.meta
-            if meta.err:
+            if failed:
                 return
-
-            account_keys = tx.value.transaction.transaction.message.account_keys
-            str_keys = [str(k) for k in account_keys]
-            
-            pre_balances = meta.pre_balances
-            post_balances = meta.post_balances
             
             if monitored_address in str_keys:
                 idx = str_keys.index(monitored_address)
@@ -191,17 +649,20 @@ class Watchdog:
                     
                     if max_gain > 0:
                         risk = get_risk_label(receiver)
-                        msg = f"⚠ ALERT: {monitored_address} moved {abs(diff):.4f} SOL to {receiver}. Risk: {risk}"
+                        # Block time, so backfilled alerts carry when the funds actually moved
+                        alert = AlertRecord(block_time or time.time(), abs(diff), receiver, risk)
+                        msg = alert.format(monitored_address)
                         
                         if monitored_address in scammer_db:
                             scammer_db[monitored_address].risk_label = risk
                             scammer_db[monitored_address].status = "Active Movement"
-                            scammer_db[monitored_address].recent_logs.append(msg)
-                            # Keep only last 50 logs
-                            if len(scammer_db[monitored_address].recent_logs) > 50:
-                                scammer_db[monitored_address].recent_logs.pop(0)
+                            scammer_db[monitored_address].alerts.append(alert)
+                            mark_dirty(monitored_address)
+                            status_stream.publish(monitored_address, "alert", log=msg, status="Active Movement",
+                                                  risk_label=risk)
                             
-                        await trigger_whatsapp_alert(msg)
+                        # Queued; delivery, dedup and rate limits happen in the dispatcher
+                        await alert_dispatcher.submit(monitored_address, msg, raised_at=time.perf_counter())
 
         except Exception as e:
             print(f"Error analyzing tx {signature}: {e}")
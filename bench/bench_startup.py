@@ -0,0 +1,96 @@
+"""
+Cold start: time until a fresh API process answers, and how long its first /verify takes.
+
+    python -m bench.bench_startup --runs 5
+    python -m bench.bench_startup --runs 5 --modes lazy
+
+Each run spawns a new uvicorn process against the simulator, so the numbers
+include interpreter start-up, imports and the lifespan (STARTUP_MODE).
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+from .common import ROOT, free_port, report, spawn, wait_for
+
+
+def import_time() -> float:
+    """Seconds to import app.main in a fresh interpreter."""
+    code = "import time; t = time.perf_counter(); import app.main; print(time.perf_counter() - t)"
+    output = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    return float(output.stdout.strip().splitlines()[-1])
+
+
+def cold_start(mode: str, sim_url: str, payload: dict) -> dict:
+    port = free_port()
+    api_url = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    process = spawn(
+        ["-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env={"SOLANA_RPC_URL": sim_url, "SOLANA_WS_URL": sim_url.replace("http", "ws", 1),
+             "STATE_BACKEND": "memory", "STARTUP_MODE": mode},
+    )
+    try:
+        with httpx.Client(timeout=30) as client:
+            while True:
+                try:
+                    client.get(f"{api_url}/")
+                    break
+                except httpx.TransportError:
+                    if process.poll() is not None:
+                        raise RuntimeError("API process exited during startup")
+                    time.sleep(0.005)
+            ready = time.perf_counter()
+            client.post(f"{api_url}/api/v1/verify", json=payload).raise_for_status()
+            verified = time.perf_counter()
+            profile = client.get(f"{api_url}/startup").json()
+    finally:
+        process.terminate()
+        process.wait()
+    return {"ready": ready - started, "first_verify": verified - ready, "verified": verified - started,
+            "profile": profile}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--modes", default="eager,lazy", help="STARTUP_MODE values to compare")
+    parser.add_argument("--sim-url")
+    args = parser.parse_args()
+
+    processes = []
+    try:
+        sim_url = args.sim_url
+        if not sim_url:
+            port = free_port()
+            sim_url = f"http://127.0.0.1:{port}"
+            processes.append(spawn(["-m", "bench.simulator", "--port", str(port), "--seed-transactions", "10"]))
+        wait_for(f"{sim_url}/sim/stats")
+        payload = httpx.get(f"{sim_url}/sim/transactions", params={"limit": 1}).json()[0]
+
+        imports = [import_time() for _ in range(args.runs)]
+        report("import", {"runs": args.runs, "import app.main ms (median)": round(statistics.median(imports) * 1000, 1)})
+
+        for mode in args.modes.split(","):
+            runs = [cold_start(mode, sim_url, payload) for _ in range(args.runs)]
+            rows = {
+                "runs": args.runs,
+                "spawn -> ready ms (median)": round(statistics.median(r["ready"] for r in runs) * 1000, 1),
+                "first /verify ms (median)": round(statistics.median(r["first_verify"] for r in runs) * 1000, 1),
+                "spawn -> first verify ms (median)": round(statistics.median(r["verified"] for r in runs) * 1000, 1),
+            }
+            # Phase breakdown from the last run's GET /startup
+            for phase in runs[-1]["profile"]["phases"]:
+                rows[f"  {phase['phase']} ms"] = phase["ms"]
+            report(f"cold start ({mode})", rows)
+    finally:
+        for process in processes:
+            process.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+/verify throughput and latency against the local RPC simulator.
+
+    python -m bench.bench_verify --requests 2000 --concurrency 50
+
+Starts the simulator and the API as subprocesses unless --api-url/--sim-url
+point at running ones.
+"""
+import argparse
+import asyncio
+import random
+import time
+
+import httpx
+
+from .common import free_port, percentiles, report, spawn, wait_for
+
+
+async def run_load(api_url: str, payloads: list, requests: int, concurrency: int, batch: int):
+    latencies = []
+    failures = 0
+    queue: asyncio.Queue = asyncio.Queue()
+    for i in range(requests):
+        queue.put_nowait(i)
+
+    async with httpx.AsyncClient(timeout=60, limits=httpx.Limits(max_connections=concurrency)) as client:
+        async def worker():
+            nonlocal failures
+            while not queue.empty():
+                queue.get_nowait()
+                started = time.perf_counter()
+                if batch > 1:
+                    response = await client.post(f"{api_url}/api/v1/verify/batch", json=random.sample(payloads, batch))
+                else:
+                    response = await client.post(f"{api_url}/api/v1/verify", json=random.choice(payloads))
+                latencies.append(time.perf_counter() - started)
+                if response.status_code != 200:
+                    failures += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return latencies, failures, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--transactions", type=int, default=1000, help="distinct signatures to verify")
+    parser.add_argument("--batch", type=int, default=1, help="items per request, >1 uses /verify/batch")
+    parser.add_argument("--api-url")
+    parser.add_argument("--sim-url")
+    args = parser.parse_args()
+
+    processes = []
+    try:
+        sim_url = args.sim_url
+        if not sim_url:
+            port = free_port()
+            sim_url = f"http://127.0.0.1:{port}"
+            processes.append(spawn(["-m", "bench.simulator", "--port", str(port),
+                                    "--seed-transactions", str(args.transactions)]))
+        wait_for(f"{sim_url}/sim/stats")
+
+        api_url = args.api_url
+        if not api_url:
+            port = free_port()
+            api_url = f"http://127.0.0.1:{port}"
+            processes.append(spawn(
+                ["-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+                env={"SOLANA_RPC_URL": sim_url, "SOLANA_WS_URL": sim_url.replace("http", "ws", 1),
+                     "STATE_BACKEND": "memory"},
+            ))
+        wait_for(f"{api_url}/")
+
+        payloads = httpx.get(f"{sim_url}/sim/transactions", params={"limit": args.transactions}).json()
+        latencies, failures, elapsed = asyncio.run(
+            run_load(api_url, payloads, args.requests, args.concurrency, args.batch))
+        cache = httpx.get(f"{api_url}/api/v1/cache/stats").json()
+
+        items = args.requests * args.batch
+        report("verify", {
+            "requests": args.requests,
+            "items per request": args.batch,
+            "concurrency": args.concurrency,
+            "failures": failures,
+            "elapsed s": round(elapsed, 3),
+            "requests/s": round(args.requests / elapsed, 1),
+            "items/s": round(items / elapsed, 1),
+            **{f"latency {k} ms": v for k, v in percentiles(latencies).items()},
+            "cache hit ratio": cache.get("hit_ratio"),
+        })
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Notification-to-alert latency and memory for N monitored wallets.
+
+    python -m bench.bench_watchdog --wallets 500 --rate 200 --duration 20
+    python -m bench.bench_watchdog --wallets 5000 --ingest firehose
+
+The simulator and the watchdog run in this process so emission and alert
+times share a clock; numbers include the simulator's own CPU use.
+"""
+import argparse
+import asyncio
+import os
+import re
+import time
+import tracemalloc
+
+from .common import free_port, percentiles, report
+
+ALERT_RECEIVER = re.compile(r" to (\S+)\. Risk")
+
+
+async def run(args):
+    port = free_port()
+    url = f"127.0.0.1:{port}"
+    # Must be set before the app modules build their clients
+    os.environ.update({
+        "SOLANA_RPC_URL": f"http://{url}",
+        "SOLANA_WS_URL": f"ws://{url}",
+        "STATE_BACKEND": "memory",
+        "ANALYSIS_DELAY": "0",
+        "ALERT_SINKS": "",
+        "INGEST_MODE": args.ingest,
+    })
+
+    import uvicorn
+    from app.activity import WalletState
+    from app.alerts import alert_dispatcher
+    from app.startup import lazy_modules
+    from app.state import put_status, scammer_db
+    from app.watchdog import watchdog_service
+    from .simulator import Ledger, Simulator, create_app, random_address
+
+    simulator = Simulator(Ledger(), rate=0)
+    server = uvicorn.Server(uvicorn.Config(create_app(simulator), host="127.0.0.1", port=port, log_level="warning"))
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    latencies = []
+    original_submit = alert_dispatcher.submit
+
+    async def timed_submit(wallet: str, text: str, **kwargs):
+        match = ALERT_RECEIVER.search(text)
+        signature = simulator.ledger.receivers.get(match.group(1)) if match else None
+        if signature in simulator.ledger.emitted_at:
+            latencies.append(time.perf_counter() - simulator.ledger.emitted_at[signature])
+        await original_submit(wallet, text, **kwargs)
+
+    alert_dispatcher.submit = timed_submit
+    alert_dispatcher.start()
+
+    # Deferred imports would otherwise be counted as monitor memory
+    for module in lazy_modules():
+        module.load()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    wallets = [random_address() for _ in range(args.wallets)]
+    for wallet in wallets:
+        put_status(WalletState(wallet))
+    await asyncio.gather(*(watchdog_service.start_monitoring(w) for w in wallets))
+    while simulator_subscriptions(simulator, watchdog_service.firehose) < args.wallets:
+        await asyncio.sleep(0.1)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    monitor_bytes = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+
+    simulator.wallets = wallets  # firehose mode leaves no per-wallet subscriptions to pick from
+    simulator.rate = args.rate
+    emitter = asyncio.create_task(simulator.emit_loop())
+    await asyncio.sleep(args.duration)
+    emitter.cancel()
+    await asyncio.sleep(1)  # let in-flight analysis finish
+
+    state_bytes = sum(scammer_db[w].nbytes() for w in wallets)
+    report("watchdog", {
+        "wallets": args.wallets,
+        "ingest": args.ingest,
+        "ws connections": len(watchdog_service.subscriptions.connections) if args.ingest == "subscriptions" else 1,
+        "emitted": simulator.emitted,
+        "alerts": len(latencies),
+        "emit rate /s": args.rate,
+        **{f"notify->alert {k} ms": v for k, v in percentiles(latencies).items()},
+        "memory per monitor (traced) B": monitor_bytes // max(1, args.wallets),
+        "wallet state per wallet B": state_bytes // max(1, args.wallets),
+    })
+
+    for wallet in wallets:
+        await watchdog_service.stop_monitoring(wallet)
+    await alert_dispatcher.stop()
+    server.should_exit = True
+    await server_task
+
+
+def simulator_subscriptions(simulator, firehose) -> int:
+    if firehose is not None:
+        # One block subscription serves every wallet
+        return len(firehose.monitored) if simulator.block_subs else 0
+    return sum(len(subs) for subs in simulator.logs_subs.values())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--wallets", type=int, default=200)
+    parser.add_argument("--rate", type=float, default=100, help="simulated transactions per second")
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--ingest", choices=["subscriptions", "firehose"], default="subscriptions")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+import math
+import os
+import socket
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+
+import httpx
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+
+
+def percentiles(samples: List[float], points=(50, 90, 99)) -> Dict[str, float]:
+    """Nearest-rank percentiles in milliseconds."""
+    if not samples:
+        return {f"p{p}": 0.0 for p in points}
+    ordered = sorted(samples)
+    return {f"p{p}": round(ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)] * 1000, 2) for p in points}
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def spawn(args: List[str], env: Optional[dict] = None) -> subprocess.Popen:
+    return subprocess.Popen([sys.executable, *args], cwd=ROOT, env={**os.environ, **(env or {})})
+
+
+def wait_for(url: str, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(url, timeout=1)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+
+def report(title: str, rows: Dict[str, object]):
+    print(f"\n== {title} ==")
+    width = max(len(k) for k in rows)
+    for key, value in rows.items():
+        print(f"{key.ljust(width)}  {value}")
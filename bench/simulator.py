@@ -0,0 +1,318 @@
+"""
+Local stand-in for the Solana JSON-RPC and PubSub methods the watchdog uses.
+
+    python -m bench.simulator --port 8899 --rate 50
+    SOLANA_RPC_URL=http://127.0.0.1:8899 SOLANA_WS_URL=ws://127.0.0.1:8899 uvicorn app.main:app
+
+Transactions are synthetic SOL transfers (or replayed from a JSONL file of
+recorded getTransaction results) and are pushed to logsSubscribe/accountSubscribe
+subscribers at a fixed rate. blockSubscribe subscribers get every transaction
+as a one-transaction block.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional, Set, Tuple
+
+import uvicorn
+from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
+from solders.pubkey import Pubkey
+from solders.signature import Signature
+
+SYSTEM_PROGRAM = "11111111111111111111111111111111"
+STARTING_LAMPORTS = 1000 * 10**9
+FEE = 5000
+
+
+def random_address() -> str:
+    return str(Pubkey.from_bytes(os.urandom(32)))
+
+
+def random_signature() -> str:
+    return str(Signature.from_bytes(os.urandom(64)))
+
+
+class Ledger:
+    """In-memory chain: transactions, per-address history and balances."""
+
+    def __init__(self):
+        self.slot = 1000
+        self.transactions: Dict[str, dict] = {}
+        self.history: Dict[str, List[dict]] = {}  # oldest first
+        self.balances: Dict[str, int] = {}
+        self.emitted_at: Dict[str, float] = {}
+        self.receivers: Dict[str, str] = {}  # receiver -> signature, receivers are unique per transfer
+
+    def balance(self, address: str) -> int:
+        return self.balances.setdefault(address, STARTING_LAMPORTS)
+
+    def add(self, result: dict) -> str:
+        signature = result["transaction"]["signatures"][0]
+        self.transactions[signature] = result
+        info = {"signature": signature, "slot": result["slot"], "err": result["meta"]["err"],
+                "memo": None, "blockTime": result["blockTime"], "confirmationStatus": "confirmed"}
+        for key in result["transaction"]["message"]["accountKeys"]:
+            self.history.setdefault(key, []).append(info)
+        for key, post in zip(result["transaction"]["message"]["accountKeys"], result["meta"]["postBalances"]):
+            self.balances[key] = post
+        return signature
+
+    def transfer(self, source: str, destination: str, lamports: int) -> str:
+        self.slot += 1
+        signature = random_signature()
+        keys = [source, destination, SYSTEM_PROGRAM]
+        pre = [self.balance(source), self.balance(destination) if destination in self.balances else 0, 1]
+        post = [pre[0] - lamports - FEE, pre[1] + lamports, 1]
+        self.add({
+            "slot": self.slot,
+            "blockTime": int(time.time()),
+            "version": "legacy",
+            "transaction": {
+                "signatures": [signature],
+                "message": {
+                    "accountKeys": keys,
+                    "header": {"numRequiredSignatures": 1, "numReadonlySignedAccounts": 0, "numReadonlyUnsignedAccounts": 1},
+                    "recentBlockhash": SYSTEM_PROGRAM,
+                    "instructions": [{"programIdIndex": 2, "accounts": [0, 1], "data": "3Bxs4h24hBtQy9rw"}],
+                },
+            },
+            "meta": {
+                "err": None, "fee": FEE, "status": {"Ok": None},
+                "preBalances": pre, "postBalances": post,
+                "preTokenBalances": [], "postTokenBalances": [],
+                "innerInstructions": [], "rewards": [],
+                "logMessages": [f"Program {SYSTEM_PROGRAM} invoke [1]", f"Program {SYSTEM_PROGRAM} success"],
+            },
+        })
+        self.receivers[destination] = signature
+        return signature
+
+    def load_recording(self, path: str) -> List[str]:
+        """JSONL of getTransaction results (or full responses); returns signatures in file order."""
+        signatures = []
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    data = json.loads(line)
+                    signatures.append(self.add(data.get("result", data)))
+        return signatures
+
+
+class Simulator:
+    def __init__(self, ledger: Ledger, rate: float = 0.0, wallets: Optional[List[str]] = None,
+                 replay: Optional[List[str]] = None):
+        self.ledger = ledger
+        self.rate = rate
+        self.wallets = wallets or []
+        self.replay = deque(replay or [])
+        self.sub_ids = iter(range(1, 1 << 62))
+        self.logs_subs: Dict[str, Set[Tuple[WebSocket, int]]] = {}
+        self.account_subs: Dict[str, Set[Tuple[WebSocket, int]]] = {}
+        self.block_subs: Set[Tuple[WebSocket, int]] = set()
+        self.emitted = 0
+
+    # JSON-RPC
+
+    def _context(self) -> dict:
+        return {"slot": self.ledger.slot}
+
+    def handle_rpc(self, request: dict) -> dict:
+        method, params = request.get("method"), request.get("params") or []
+        ledger = self.ledger
+        result = None
+        if method == "getTransaction":
+            result = ledger.transactions.get(params[0])
+        elif method == "getSignatureStatuses":
+            value = []
+            for sig in params[0]:
+                tx = ledger.transactions.get(sig)
+                value.append(None if tx is None else {
+                    "slot": tx["slot"], "confirmations": None, "err": tx["meta"]["err"],
+                    "status": tx["meta"]["status"], "confirmationStatus": "finalized",
+                })
+            result = {"context": self._context(), "value": value}
+        elif method == "getSignaturesForAddress":
+            config = params[1] if len(params) > 1 else {}
+            infos = list(reversed(ledger.history.get(params[0], [])))
+            if config.get("before"):
+                sigs = [i["signature"] for i in infos]
+                infos = infos[sigs.index(config["before"]) + 1:] if config["before"] in sigs else []
+            if config.get("until"):
+                sigs = [i["signature"] for i in infos]
+                infos = infos[:sigs.index(config["until"])] if config["until"] in sigs else infos
+            result = infos[:config.get("limit", 1000)]
+        elif method == "getBalance":
+            result = {"context": self._context(), "value": ledger.balance(params[0])}
+        elif method == "getTokenAccountsByOwner":
+            result = {"context": self._context(), "value": []}
+        elif method == "getMultipleAccounts":
+            result = {"context": self._context(), "value": [None for _ in params[0]]}
+        elif method == "getAccountInfo":
+            result = {"context": self._context(), "value": None}
+        elif method == "getSlot":
+            result = ledger.slot
+        else:
+            return {"jsonrpc": "2.0", "id": request.get("id"), "error": {"code": -32601, "message": "Method not found"}}
+        return {"jsonrpc": "2.0", "id": request.get("id"), "result": result}
+
+    # PubSub
+
+    async def handle_ws(self, websocket: WebSocket):
+        await websocket.accept()
+        owned: List[Tuple[Dict[str, Set], str, Tuple[WebSocket, int]]] = []
+        try:
+            while True:
+                request = json.loads(await websocket.receive_text())
+                method, params = request.get("method", ""), request.get("params") or []
+                if method.endswith("Unsubscribe"):
+                    for registry, key, entry in list(owned):
+                        if entry[1] == params[0]:
+                            registry.get(key, set()).discard(entry)
+                            owned.remove((registry, key, entry))
+                    await websocket.send_text(json.dumps({"jsonrpc": "2.0", "id": request.get("id"), "result": True}))
+                    continue
+
+                sub_id = next(self.sub_ids)
+                entry = (websocket, sub_id)
+                if method == "logsSubscribe" and isinstance(params[0], dict):
+                    for address in params[0].get("mentions", []):
+                        self.logs_subs.setdefault(address, set()).add(entry)
+                        owned.append((self.logs_subs, address, entry))
+                elif method == "accountSubscribe":
+                    self.account_subs.setdefault(params[0], set()).add(entry)
+                    owned.append((self.account_subs, params[0], entry))
+                elif method == "blockSubscribe":
+                    self.block_subs.add(entry)
+                # Other subscriptions are acknowledged but never notified
+                await websocket.send_text(json.dumps({"jsonrpc": "2.0", "id": request.get("id"), "result": sub_id}))
+        except WebSocketDisconnect:
+            pass
+        finally:
+            for registry, key, entry in owned:
+                registry.get(key, set()).discard(entry)
+            self.block_subs = {entry for entry in self.block_subs if entry[0] is not websocket}
+
+    async def _send(self, entry: Tuple[WebSocket, int], method: str, value: dict):
+        websocket, sub_id = entry
+        try:
+            await websocket.send_text(json.dumps({
+                "jsonrpc": "2.0",
+                "method": method,
+                "params": {"result": {"context": self._context(), "value": value}, "subscription": sub_id},
+            }))
+        except Exception:
+            pass
+
+    async def notify(self, signature: str):
+        tx = self.ledger.transactions[signature]
+        self.ledger.emitted_at[signature] = time.perf_counter()
+        self.emitted += 1
+        keys = tx["transaction"]["message"]["accountKeys"]
+        logs = {"signature": signature, "err": tx["meta"]["err"], "logs": tx["meta"]["logMessages"]}
+        sends = []
+        for key, post in zip(keys, tx["meta"]["postBalances"]):
+            for entry in list(self.logs_subs.get(key, ())):
+                sends.append(self._send(entry, "logsNotification", logs))
+            for entry in list(self.account_subs.get(key, ())):
+                sends.append(self._send(entry, "accountNotification", {
+                    "lamports": post, "owner": SYSTEM_PROGRAM, "data": ["", "base64"],
+                    "executable": False, "rentEpoch": 0, "space": 0,
+                }))
+        if self.block_subs:
+            block = {"slot": tx["slot"], "err": None, "block": {
+                "blockhash": SYSTEM_PROGRAM, "previousBlockhash": SYSTEM_PROGRAM, "parentSlot": tx["slot"] - 1,
+                "blockTime": tx["blockTime"], "blockHeight": tx["slot"],
+                "transactions": [{"transaction": tx["transaction"], "meta": tx["meta"], "version": tx["version"]}],
+            }}
+            for entry in list(self.block_subs):
+                sends.append(self._send(entry, "blockNotification", block))
+        await asyncio.gather(*sends)
+
+    def _next_signature(self) -> Optional[str]:
+        if self.replay:
+            return self.replay.popleft()
+        candidates = self.wallets or list(self.logs_subs)
+        if not candidates:
+            return None
+        source = random.choice(candidates)
+        return self.ledger.transfer(source, random_address(), random.randint(10**7, 10**9))
+
+    async def emit_loop(self):
+        """Emits `rate` transactions per second, catching up in batches when behind."""
+        if self.rate <= 0:
+            return
+        started, sent = time.perf_counter(), 0
+        while True:
+            due = int((time.perf_counter() - started) * self.rate) - sent
+            for _ in range(max(due, 0)):
+                signature = self._next_signature()
+                if signature is not None:
+                    await self.notify(signature)
+                sent += 1
+            await asyncio.sleep(1 / self.rate if self.rate < 1000 else 0.001)
+
+
+def create_app(simulator: Simulator) -> FastAPI:
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        emitter = asyncio.create_task(simulator.emit_loop())
+        yield
+        emitter.cancel()
+
+    app = FastAPI(title="Solana RPC simulator", lifespan=lifespan)
+
+    @app.post("/")
+    async def rpc(request: Request):
+        body = await request.json()
+        if isinstance(body, list):
+            return [simulator.handle_rpc(item) for item in body]
+        return simulator.handle_rpc(body)
+
+    @app.websocket("/")
+    async def pubsub(websocket: WebSocket):
+        await simulator.handle_ws(websocket)
+
+    @app.get("/sim/transactions")
+    async def transactions(limit: int = 1000):
+        """Known transfers as (signature, sender, receiver) for building /verify load."""
+        out = []
+        for signature, tx in list(simulator.ledger.transactions.items())[:limit]:
+            keys = tx["transaction"]["message"]["accountKeys"]
+            out.append({"transaction_signature": signature, "user_wallet": keys[0], "scammer_wallet": keys[1]})
+        return out
+
+    @app.get("/sim/stats")
+    async def stats():
+        return {"slot": simulator.ledger.slot, "transactions": len(simulator.ledger.transactions),
+                "emitted": simulator.emitted, "logs_subscriptions": sum(len(s) for s in simulator.logs_subs.values()),
+                "block_subscriptions": len(simulator.block_subs)}
+
+    return app
+
+
+def build_simulator(args) -> Simulator:
+    ledger = Ledger()
+    for _ in range(args.seed_transactions):
+        ledger.transfer(random_address(), random_address(), random.randint(10**7, 10**9))
+    replay = ledger.load_recording(args.replay) if args.replay else None
+    return Simulator(ledger, rate=args.rate, replay=replay)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8899)
+    parser.add_argument("--rate", type=float, default=0.0, help="transactions pushed per second")
+    parser.add_argument("--seed-transactions", type=int, default=1000, help="transfers created at startup")
+    parser.add_argument("--replay", help="JSONL file of recorded getTransaction results to push in order")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    uvicorn.run(create_app(build_simulator(args)), host=args.host, port=args.port, log_level="warning")
@@ -0,0 +1,4 @@
+import os
+
+# Keep tests off the on-disk SQLite store
+os.environ.setdefault("STATE_BACKEND", "memory")
@@ -0,0 +1,79 @@
+import asyncio
+
+from solders.signature import Signature
+
+from app import watchdog
+from app.activity import WalletState
+from app.state import scammer_db
+
+ADDRESS = "9xQeWvG816bUx9EPjHmaT23yvVM2ZWbrrpZb9PusVFin"
+
+
+class FakeRPC:
+    """getSignaturesForAddress over an in-memory history, oldest first."""
+
+    def __init__(self):
+        self.history = []
+
+    async def get_signatures_for_address(self, address, limit=1000, before=None, until=None):
+        signatures = list(reversed(self.history))
+        if before in signatures:
+            signatures = signatures[signatures.index(before) + 1:]
+        if until in signatures:
+            signatures = signatures[:signatures.index(until)]
+        return [{"signature": s} for s in signatures[:limit]]
+
+
+def _watchdog(rpc, analyzed):
+    service = watchdog.Watchdog()
+    service.rpc_client = rpc
+
+    async def analyze(address, signature, received=None, delay=None):
+        analyzed.append(signature)
+
+    service._analyze_transaction = analyze
+    return service
+
+
+async def _backfill(service):
+    """Runs a backfill registered the way _go_live starts one."""
+    service._seen_signatures[ADDRESS] = set()
+    task = service._backfills[ADDRESS] = asyncio.create_task(service.backfill(ADDRESS))
+    await task
+
+
+def test_restart_does_not_reanalyze_live_signatures(monkeypatch):
+    async def prefetch(signatures):
+        pass
+
+    monkeypatch.setattr(watchdog, "get_transactions", prefetch)
+
+    async def main():
+        rpc = FakeRPC()
+        analyzed = []
+        first = _watchdog(rpc, analyzed)
+        scammer_db[ADDRESS] = WalletState(ADDRESS)
+        # No history yet when monitoring starts
+        await _backfill(first)
+
+        # More live signatures than the activity ring holds
+        for _ in range(120):
+            signature = str(Signature.new_unique())
+            rpc.history.append(signature)
+            assert first._record_signature(ADDRESS, signature)
+        saved = scammer_db.pop(ADDRESS).to_json()
+
+        # Activity while the process was down
+        missed = [str(Signature.new_unique()) for _ in range(3)]
+        rpc.history.extend(missed)
+
+        analyzed.clear()
+        scammer_db[ADDRESS] = WalletState.from_json(saved)
+        await _backfill(_watchdog(rpc, analyzed))
+        assert analyzed == missed
+        assert scammer_db[ADDRESS].backfill_cursor == missed[-1]
+
+    try:
+        asyncio.run(main())
+    finally:
+        scammer_db.pop(ADDRESS, None)
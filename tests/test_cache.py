@@ -0,0 +1,110 @@
+import asyncio
+
+import pytest
+
+from app.cache import LRUCache, TransactionCache
+
+
+def test_cancelled_caller_does_not_cancel_coalesced_fetch():
+    async def main():
+        cache = TransactionCache(max_size=10)
+        release = asyncio.Event()
+        calls = []
+
+        async def fetch(key):
+            calls.append(key)
+            await release.wait()
+            return f"tx-{key}", "finalized"
+
+        first = asyncio.create_task(cache.get_or_fetch("sig", fetch))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(cache.get_or_fetch("sig", fetch))
+        await asyncio.sleep(0)
+
+        first.cancel()
+        await asyncio.sleep(0)
+        release.set()
+
+        assert await waiter == "tx-sig"
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        assert calls == ["sig"]
+        assert cache.get("sig", "finalized") == "tx-sig"
+        assert cache.stats()["inflight"] == 0
+
+    asyncio.run(main())
+
+
+def test_fetch_error_reaches_every_waiter():
+    async def main():
+        cache = TransactionCache(max_size=10)
+
+        async def fetch(key):
+            await asyncio.sleep(0)
+            raise RuntimeError("rpc down")
+
+        results = await asyncio.gather(*(cache.get_or_fetch("sig", fetch) for _ in range(3)),
+                                       return_exceptions=True)
+        assert all(isinstance(r, RuntimeError) for r in results)
+        assert cache.stats()["coalesced"] == 2
+        assert cache.get("sig") is None
+
+    asyncio.run(main())
+
+
+def test_none_result_is_not_cached():
+    async def main():
+        cache = TransactionCache(max_size=10)
+
+        async def fetch(key):
+            return None, "confirmed"
+
+        assert await cache.get_or_fetch("sig", fetch) is None
+        assert len(cache) == 0
+
+    asyncio.run(main())
+
+
+def test_batch_shares_fetches_with_single_lookups():
+    async def main():
+        cache = TransactionCache(max_size=10)
+        release = asyncio.Event()
+        single, batched = [], []
+
+        async def fetch(key):
+            single.append(key)
+            await release.wait()
+            return f"tx-{key}", "finalized"
+
+        async def fetch_many(keys):
+            batched.append(keys)
+            await release.wait()
+            return {key: (f"tx-{key}", "finalized") for key in keys}
+
+        alone = asyncio.create_task(cache.get_or_fetch("a", fetch))
+        await asyncio.sleep(0)
+        batch = asyncio.create_task(cache.get_or_fetch_many(["a", "b", "c"], fetch_many))
+        await asyncio.sleep(0)
+        during = asyncio.create_task(cache.get_or_fetch("b", fetch))
+        await asyncio.sleep(0)
+        release.set()
+
+        assert await batch == {"a": "tx-a", "b": "tx-b", "c": "tx-c"}
+        assert await alone == "tx-a" and await during == "tx-b"
+        assert single == ["a"] and batched == [["b", "c"]]
+        assert cache.stats()["coalesced"] == 2
+        assert cache.stats()["inflight"] == 0
+
+    asyncio.run(main())
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(max_size=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.lookup("a") == 1
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.lookup("a") == 1 and cache.lookup("c") == 3
+    assert cache.lookup("b") is None
+    assert cache.stats() == {"size": 2, "max_size": 2, "hits": 3, "misses": 1, "evictions": 1, "hit_ratio": 0.75}